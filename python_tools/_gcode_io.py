@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+BROK CNC - shared G-code reader
+===============================
+Splits a BROK .nc file into skeleton + holes as (N, 2) float64 arrays.
+Used by brok_cnc.py, brok_qc_generator.py and brok_teeth_fix.py.
+
+The G1 scan is a Numba byte loop when numba is installed, otherwise
+(or for any coordinate it can't parse exactly) the compiled regexes.
+"""
+import os
+import re
+import mmap
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+G1_RE = re.compile(rb'^[ \t]*G1X([-\d.]+)Y([-\d.]+)', re.M)
+
+# Exact powers of ten - mantissa / 10**k is then correctly rounded,
+# same as float()
+POW10 = np.array([float(10 ** k) for k in range(16)])
+
+
+@njit(cache=True)
+def _run_end(buf, i):
+    """End of the [-0-9.] run starting at i"""
+    n = len(buf)
+    while i < n and (buf[i] == 45 or buf[i] == 46 or 48 <= buf[i] <= 57):
+        i += 1
+    return i
+
+
+@njit(cache=True)
+def _parse_run(buf, a, b):
+    """buf[a:b] as a float -> (value, ok); ok is False for anything
+    float() would reject or that needs more than 15 digits"""
+    neg = buf[a] == 45
+    if neg:
+        a += 1
+    mant = 0
+    digits = 0
+    frac = 0
+    seen_dot = False
+    for k in range(a, b):
+        c = buf[k]
+        if c == 46:
+            if seen_dot:
+                return 0.0, False
+            seen_dot = True
+        elif c == 45:
+            return 0.0, False
+        else:
+            mant = mant * 10 + (c - 48)
+            digits += 1
+            if seen_dot:
+                frac += 1
+    if digits == 0 or digits > 15:
+        return 0.0, False
+    v = mant / POW10[frac]
+    return (-v if neg else v), True
+
+
+@njit(cache=True)
+def _scan_g1(buf):
+    """Every 'G1X<num>Y<num>' line -> (line offsets, (N, 2) coords, ok)"""
+    n = len(buf)
+    cap = n // 6 + 1  # shortest move is 'G1X0Y0'
+    starts = np.empty(cap, np.int64)
+    xy = np.empty((cap, 2), np.float64)
+    count = 0
+    i = 0
+    while i < n:
+        line = i
+        while i < n and (buf[i] == 32 or buf[i] == 9):
+            i += 1
+        if i + 3 <= n and buf[i] == 71 and buf[i + 1] == 49 and buf[i + 2] == 88:
+            a = i + 3
+            b = _run_end(buf, a)
+            if b > a and b < n and buf[b] == 89:
+                c = b + 1
+                d = _run_end(buf, c)
+                if d > c:
+                    x, okx = _parse_run(buf, a, b)
+                    y, oky = _parse_run(buf, c, d)
+                    if not (okx and oky):
+                        return starts[:0], xy[:0], False
+                    starts[count] = line
+                    xy[count, 0] = x
+                    xy[count, 1] = y
+                    count += 1
+        # Next line
+        while i < n and buf[i] != 10:
+            i += 1
+        i += 1
+    return starts[:count], xy[:count], True
+
+
+def _scan_g1_regex(data):
+    moves = list(G1_RE.finditer(data))
+    starts = np.array([m.start() for m in moves], dtype=np.int64)
+    xy = np.array([(float(m.group(1)), float(m.group(2))) for m in moves],
+                  dtype=np.float64).reshape(-1, 2)
+    return starts, xy
+
+
+def _section_marks(data):
+    """(line offset, kind) of every section header line, in file order.
+
+    Only lines holding a keyword are looked at - bytes.find jumps between
+    them - and are classified in the usual priority: HOLE+CUT, then
+    SKELETON, then RING.
+    """
+    lines = set()
+    for word in (b'HOLE', b'SKELETON', b'RING'):
+        i = data.find(word)
+        while i != -1:
+            lines.add(data.rfind(b'\n', 0, i) + 1)
+            end = data.find(b'\n', i)
+            if end == -1:
+                break
+            i = data.find(word, end)
+
+    marks = []
+    for start in sorted(lines):
+        end = data.find(b'\n', start)
+        line = data[start:] if end == -1 else data[start:end]
+        if b'HOLE' in line and b'CUT' in line:
+            marks.append((start, 'hole'))
+        elif b'SKELETON' in line:
+            marks.append((start, 'skeleton'))
+        elif b'RING' in line:
+            marks.append((start, 'ring'))
+    return marks
+
+
+def parse_skeleton_holes(data):
+    """G-code bytes (or mmap) -> (skeleton, holes); each move belongs to
+    the last section header before it, empty holes are dropped"""
+    ok = False
+    if HAVE_NUMBA:
+        starts, xy, ok = _scan_g1(np.frombuffer(data, dtype=np.uint8))
+    if not ok:
+        starts, xy = _scan_g1_regex(data)
+
+    marks = _section_marks(data)
+    section = np.searchsorted([pos for pos, _ in marks], starts, side='right') - 1
+    bounds = np.searchsorted(section, np.arange(len(marks) + 1))
+
+    skeleton = []
+    holes = []
+    for i, (_, kind) in enumerate(marks):
+        seg = xy[bounds[i]:bounds[i + 1]]
+        if kind == 'skeleton':
+            skeleton.append(seg)
+        elif kind == 'hole' and len(seg):
+            holes.append(seg)
+    skeleton = np.concatenate(skeleton) if skeleton else np.empty((0, 2), dtype=np.float64)
+    return skeleton, holes
+
+
+def load_skeleton_holes(filepath):
+    """Parse straight from a read-only memory map of the file"""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_skeleton_holes(b'')  # can't mmap an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_skeleton_holes(mm)
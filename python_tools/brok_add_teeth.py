@@ -7,121 +7,149 @@ BROK CNC - Add Teeth to Clean Skeleton
 - 15% bigger than original reference
 - Connected to jaw (part of skeleton contour)
 """
+import os
 import re
-import math
+import logging
+from array import array
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import shutil
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
-# Load CLEAN skeleton from backup
-with open("/home/kontomeo/Desktop/BROK_BACKUPS/v0_CLEAN.nc", 'r') as f:
-    lines = f.readlines()
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional - kernels fall back to plain NumPy
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+# Diagnostics go to the "brok" logger; set BROK_DEBUG=1 to see them
+logging.basicConfig(format="%(message)s")
+log = logging.getLogger("brok")
+log.setLevel(logging.DEBUG if os.environ.get("BROK_DEBUG") else logging.INFO)
+
+# Fonts are loaded once at import
+try:
+    FONT = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
+    SMALL = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
+except OSError:
+    FONT = SMALL = ImageFont.load_default()
+
+G1_RE = re.compile(r'G1X([-\d.]+)Y([-\d.]+)')
+# Anchored lookaheads: alternatives are tried in order at column 0, so
+# HOLE+CUT wins over SKELETON wins over RING wherever they sit in the line
+SECTION_RE = re.compile(r'(?P<hole>(?=.*HOLE)(?=.*CUT))|(?P<skeleton>(?=.*SKELETON))|(?P<ring>(?=.*RING))')
+G1_FMT = "G1X%.4fY%.4fF47".__mod__
 
-# Extract skeleton and holes
-skeleton = []
+def as_points(buf):
+    """Flat array('d') of x,y pairs -> (N, 2) float64 view"""
+    return np.frombuffer(buf, dtype=np.float64).reshape(-1, 2)
+
+# Load CLEAN skeleton from backup
+# Extract skeleton and holes (flat x,y buffers, viewed as (N, 2) arrays)
+skeleton = array('d')
 holes = []
-current_hole = []
+current_hole = array('d')
 in_skel = False
 in_hole = False
 
-for line in lines:
-    line = line.strip()
-    if 'HOLE' in line and 'CUT' in line:
-        if current_hole:
-            holes.append(current_hole)
-        current_hole = []
-        in_hole = True
-        in_skel = False
-    elif 'SKELETON' in line:
-        if current_hole:
-            holes.append(current_hole)
-            current_hole = []
-        in_skel = True
-        in_hole = False
-    elif 'RING' in line:
-        in_skel = False
-        in_hole = False
-
-    m = re.match(r'G1X([-\d.]+)Y([-\d.]+)', line)
-    if m:
-        x, y = float(m.group(1)), float(m.group(2))
-        if in_hole:
-            current_hole.append((x, y))
-        elif in_skel:
-            skeleton.append((x, y))
+with open("/home/kontomeo/Desktop/BROK_BACKUPS/v0_CLEAN.nc", 'r') as f:
+    for line in f:
+        line = line.strip()
+        # Hot path: most lines are G1 moves
+        m = G1_RE.match(line)
+        if m:
+            if in_hole:
+                current_hole.append(float(m.group(1)))
+                current_hole.append(float(m.group(2)))
+            elif in_skel:
+                skeleton.append(float(m.group(1)))
+                skeleton.append(float(m.group(2)))
+            continue
+
+        section = SECTION_RE.match(line)
+        kind = section.lastgroup if section else None
+        if kind == 'hole':
+            if current_hole:
+                holes.append(as_points(current_hole))
+            current_hole = array('d')
+            in_hole = True
+            in_skel = False
+        elif kind == 'skeleton':
+            if current_hole:
+                holes.append(as_points(current_hole))
+                current_hole = array('d')
+            in_skel = True
+            in_hole = False
+        elif kind == 'ring':
+            in_skel = False
+            in_hole = False
 
 if current_hole:
-    holes.append(current_hole)
+    holes.append(as_points(current_hole))
+skeleton = as_points(skeleton)
 
-print(f"[LOAD] Clean skeleton: {len(skeleton)} points")
-print(f"[LOAD] Holes: {len(holes)}")
+log.debug("[LOAD] Clean skeleton: %d points", len(skeleton))
+log.debug("[LOAD] Holes: %d", len(holes))
 
 # Find upper jaw and lower jaw segments
 # Upper jaw: right side (X > 9), Y around 8.5-9.5
 # Lower jaw: right side (X > 9), Y around 6.8-7.8
 
-upper_jaw_indices = []
-lower_jaw_indices = []
-
-for i, (x, y) in enumerate(skeleton):
-    if x > 9.0 and x < 11.5:
-        if 8.3 < y < 9.8:
-            upper_jaw_indices.append(i)
-        elif 6.8 < y < 7.8:
-            lower_jaw_indices.append(i)
-
-print(f"[JAW] Upper jaw points: {len(upper_jaw_indices)}")
-print(f"[JAW] Lower jaw points: {len(lower_jaw_indices)}")
-
-# Select evenly spaced positions for teeth
-def select_positions(indices, skeleton, count):
-    if len(indices) < count:
-        return [(i, skeleton[i][0], skeleton[i][1]) for i in indices]
+@njit(cache=True)
+def pick_jaw_points(xs, ys, x_lo, x_hi, y_lo, y_hi, count):
+    """
+    Classify jaw points and pick evenly spaced tooth indices in one pass.
+    Returns (jaw_indices, picked_indices).
+    """
+    idx = np.nonzero((xs > x_lo) & (xs < x_hi) & (ys > y_lo) & (ys < y_hi))[0]
+    if idx.size < count:
+        return idx, idx
 
     # Sort by X to get jaw from back to front
-    sorted_idx = sorted(indices, key=lambda i: skeleton[i][0])
+    order = idx[np.argsort(xs[idx], kind='mergesort')]
 
     # Skip first 15% (back of jaw - no teeth)
-    start = int(len(sorted_idx) * 0.15)
-    end = len(sorted_idx) - 1
+    start = int(order.size * 0.15)
+    picks = np.linspace(start, order.size - 1, count).astype(np.int64)
+    return idx, order[picks]
 
-    positions = []
-    step = (end - start) / (count - 1) if count > 1 else 0
+xs = np.ascontiguousarray(skeleton[:, 0])
+ys = np.ascontiguousarray(skeleton[:, 1])
 
-    for i in range(count):
-        idx = sorted_idx[int(start + i * step)]
-        x, y = skeleton[idx]
-        positions.append((idx, x, y))
+upper_jaw_indices, upper_picks = pick_jaw_points(xs, ys, 9.0, 11.5, 8.3, 9.8, 7)
+lower_jaw_indices, lower_picks = pick_jaw_points(xs, ys, 9.0, 11.5, 6.8, 7.8, 4)
 
-    return positions
+log.debug("[JAW] Upper jaw points: %d", len(upper_jaw_indices))
+log.debug("[JAW] Lower jaw points: %d", len(lower_jaw_indices))
 
-upper_positions = select_positions(upper_jaw_indices, skeleton, 7)
-lower_positions = select_positions(lower_jaw_indices, skeleton, 4)
+# Evenly spaced positions for teeth
+upper_positions = [(i, *skeleton[i].tolist()) for i in upper_picks.tolist()]
+lower_positions = [(i, *skeleton[i].tolist()) for i in lower_picks.tolist()]
 
-print(f"[TEETH] Upper positions: {len(upper_positions)}")
-print(f"[TEETH] Lower positions: {len(lower_positions)}")
+log.debug("[TEETH] Upper positions: %d", len(upper_positions))
+log.debug("[TEETH] Lower positions: %d", len(lower_positions))
 
 # Tooth dimensions (15% bigger than typical 0.3x0.4)
 tooth_w = 0.35 * 1.15  # ~0.40
 tooth_h = 0.45 * 1.15  # ~0.52
 
-print(f"[SIZE] Tooth: {tooth_w:.2f}\" wide x {tooth_h:.2f}\" tall (15% bigger)")
+log.debug("[SIZE] Tooth: %.2f\" wide x %.2f\" tall (15%% bigger)", tooth_w, tooth_h)
 
 # Insert teeth into skeleton
-# Work backwards (high index first) so insertions don't shift later indices
+# Each selected point is swapped for its tooth; one concatenate over all segments
 
-def insert_teeth(skel, positions, direction):
+def insert_teeth(skel, positions):
     """
     Insert tooth triangles into skeleton contour.
+    positions: (idx, x, y, direction) tuples, all indexing the original skel
     direction: 'down' for upper jaw, 'up' for lower jaw
     """
-    new_skel = list(skel)
-
-    # Sort by index descending
-    sorted_pos = sorted(positions, key=lambda p: p[0], reverse=True)
-
-    for idx, x, y in sorted_pos:
-        half_w = tooth_w / 2
+    half_w = tooth_w / 2
+    tooth_map = {}
 
+    for idx, x, y, direction in sorted(positions, key=lambda p: p[0]):
         if direction == 'down':
             # Upper jaw - tooth points DOWN into mouth
             tooth = [
@@ -136,137 +164,164 @@ def insert_teeth(skel, positions, direction):
                 (x, y + tooth_h),     # Tip (up)
                 (x + half_w, y)       # Right base
             ]
+        tooth_map[idx] = tooth
+        log.debug("[INSERT] Tooth at (%.2f, %.2f) -> %s", x, y, direction)
 
-        # Replace single point with 3-point tooth
-        new_skel = new_skel[:idx] + tooth + new_skel[idx+1:]
-        print(f"[INSERT] Tooth at ({x:.2f}, {y:.2f}) -> {direction}")
+    # Replace single point with 3-point tooth
+    segments = []
+    prev = 0
+    for idx in sorted(tooth_map):
+        segments.append(skel[prev:idx])
+        segments.append(np.asarray(tooth_map[idx], dtype=np.float64))
+        prev = idx + 1
+    segments.append(skel[prev:])
 
-    return new_skel
+    return np.concatenate(segments)
 
 # Add teeth to skeleton
-skeleton_teeth = insert_teeth(skeleton, upper_positions, 'down')
-skeleton_teeth = insert_teeth(skeleton_teeth, lower_positions, 'up')
+skeleton_teeth = insert_teeth(
+    skeleton,
+    [p + ('down',) for p in upper_positions] + [p + ('up',) for p in lower_positions])
 
-print(f"[RESULT] Skeleton with teeth: {len(skeleton_teeth)} points")
+log.debug("[RESULT] Skeleton with teeth: %d points", len(skeleton_teeth))
 
 # Generate QC image
 size = 1500
 margin = 50
 scale = (size - 2*margin) / 14.0
 
-img = Image.new('RGB', (size, size), '#0a0a0a')
-draw = ImageDraw.Draw(img)
-
 def px(x, y):
     return (margin + int(x * scale), size - margin - int(y * scale))
 
-# Grid
-for i in range(29):
-    p = margin + int(i * 0.5 * scale)
-    draw.line([(p, margin), (p, size-margin)], fill='#1a1a1a')
-    draw.line([(margin, p), (size-margin, p)], fill='#1a1a1a')
-
-# T-Rex skeleton in RED (workpiece STAYS)
-pts = [px(x,y) for x,y in skeleton_teeth]
-if len(pts) > 2:
-    draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=2)
-
-# Holes in CYAN (cut out REMOVED)
-for hole in holes:
-    if len(hole) > 2:
-        hpts = [px(x,y) for x,y in hole]
-        draw.polygon(hpts, outline='#4ecdc4', fill='#0a2020', width=2)
-
-# Ring in YELLOW
-cx, cy = px(6.75, 6.75)
-r = int(6.0 * scale)
-draw.ellipse([cx-r, cy-r, cx+r, cy+r], outline='#ffe66d', width=3)
-
-# Title
-try:
-    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-    small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
-except:
-    font = small = ImageFont.load_default()
-
-draw.text((size//2, 25), "BROK - TEETH ADDED TO JAW", fill='#00ff00', font=font, anchor='mm')
-draw.text((size//2, 55), f"Upper: 7 | Lower: 4 | 15% bigger | CONNECTED to jaw",
-          fill='#888', font=small, anchor='mm')
-
-# Legend
-draw.rectangle([10, size-100, 380, size-10], fill='#111', outline='#333')
-draw.rectangle([20, size-90, 40, size-75], fill='#2a0a0a', outline='#ff6b6b')
-draw.text((50, size-82), "RED = T-Rex + Teeth (workpiece STAYS)", fill='#ff6b6b', font=small, anchor='lm')
-draw.rectangle([20, size-65, 40, size-50], fill='#0a2020', outline='#4ecdc4')
-draw.text((50, size-57), "CYAN = Holes (cut out, REMOVED)", fill='#4ecdc4', font=small, anchor='lm')
-draw.rectangle([20, size-40, 40, size-25], outline='#ffe66d', width=2)
-draw.text((50, size-32), "YELLOW = Ring (CW cut)", fill='#ffe66d', font=small, anchor='lm')
-
-img.save('/home/kontomeo/Desktop/BROK_TEETH_ADDED.png')
-print(f"\n[SAVED] BROK_TEETH_ADDED.png")
+def px_many(points):
+    """Vectorized px() over an (N, 2) point list"""
+    a = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    out = np.empty(a.shape, dtype=np.int32)
+    out[:, 0] = margin + (a[:, 0] * scale).astype(np.int32)
+    out[:, 1] = size - margin - (a[:, 1] * scale).astype(np.int32)
+    return [tuple(r) for r in out.tolist()]
+
+@lru_cache(maxsize=1)
+def legend_overlay():
+    """Legend panel with swatches and labels, rendered once per process"""
+    legend = Image.new('RGBA', (371, 91), '#111')
+    ld = ImageDraw.Draw(legend)
+    ld.rectangle([0, 0, 370, 90], outline='#333')
+    ld.rectangle([10, 10, 30, 25], fill='#2a0a0a', outline='#ff6b6b')
+    ld.text((40, 18), "RED = T-Rex + Teeth (workpiece STAYS)", fill='#ff6b6b', font=SMALL, anchor='lm')
+    ld.rectangle([10, 35, 30, 50], fill='#0a2020', outline='#4ecdc4')
+    ld.text((40, 43), "CYAN = Holes (cut out, REMOVED)", fill='#4ecdc4', font=SMALL, anchor='lm')
+    ld.rectangle([10, 60, 30, 75], outline='#ffe66d', width=2)
+    ld.text((40, 68), "YELLOW = Ring (CW cut)", fill='#ffe66d', font=SMALL, anchor='lm')
+    return legend
+
+def build_and_save_image():
+    """Render the QC image and save it"""
+    # Background + grid written straight into the pixel buffer
+    canvas = np.full((size, size, 3), 0x0a, dtype=np.uint8)
+    grid = margin + (np.arange(29) * 0.5 * scale).astype(int)
+    canvas[margin:size-margin+1, grid] = 0x1a
+    canvas[grid, margin:size-margin+1] = 0x1a
+
+    img = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(img)
+
+    # T-Rex skeleton in RED (workpiece STAYS)
+    pts = px_many(skeleton_teeth)
+    if len(pts) > 2:
+        draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=2)
+
+    # Holes in CYAN (cut out REMOVED)
+    for hole in holes:
+        if len(hole) > 2:
+            hpts = px_many(hole)
+            draw.polygon(hpts, outline='#4ecdc4', fill='#0a2020', width=2)
+
+    # Ring in YELLOW
+    cx, cy = px(6.75, 6.75)
+    r = int(6.0 * scale)
+    draw.ellipse([cx-r, cy-r, cx+r, cy+r], outline='#ffe66d', width=3)
+
+    # Title
+    draw.text((size//2, 25), "BROK - TEETH ADDED TO JAW", fill='#00ff00', font=FONT, anchor='mm')
+    draw.text((size//2, 55), f"Upper: 7 | Lower: 4 | 15% bigger | CONNECTED to jaw",
+              fill='#888', font=SMALL, anchor='mm')
+
+    # Legend
+    img.paste(legend_overlay(), (10, size-100))
+
+    img.save('/home/kontomeo/Desktop/BROK_TEETH_ADDED.png')
+    print("\n[SAVED] BROK_TEETH_ADDED.png")
 
 # Generate G-code
-gcode = []
-gcode.append("(BROK CNC - TEETH CONNECTED TO JAW)")
-gcode.append("(7 upper, 4 lower, 15% bigger)")
-gcode.append("(BEVEL LAW ENFORCED)")
-gcode.append("(Feed:47 Pierce:0.148 Cut:0.059)")
-gcode.append("(v1.6-af)")
-gcode.append("G20G90")
-gcode.append("G0X0.Y0.")
-gcode.append("H0")
-gcode.append("")
-
-cut_num = 0
-
-# Holes first - CCW (inside cuts)
-for hole in holes:
-    if len(hole) < 10:
-        continue
-    cut_num += 1
-    gcode.append(f"(=== CUT {cut_num}: HOLE - CCW ===)")
-    sx, sy = hole[0]
-    gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-    gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-    gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-    for x, y in hole:
-        gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-    gcode.append("H0\nM5\nG0Z1\n")
-
-# Skeleton with teeth - CCW
-cut_num += 1
-gcode.append(f"(=== CUT {cut_num}: SKELETON WITH TEETH - CCW ===)")
-sx, sy = skeleton_teeth[0]
-gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-for x, y in skeleton_teeth:
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-gcode.append(f"G1X{skeleton_teeth[0][0]:.4f}Y{skeleton_teeth[0][1]:.4f}F47")
-gcode.append("H0\nM5\nG0Z1\n")
-
-# Ring - CW (outside cut)
-cut_num += 1
-gcode.append(f"(=== CUT {cut_num}: 12\" RING - CW ===)")
-gcode.append(f"G0X{6.75+6.2:.4f}Y6.7500")
-gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-for i in range(121):
-    angle = -2 * math.pi * i / 120
-    x = 6.75 + 6.0 * math.cos(angle)
-    y = 6.75 + 6.0 * math.sin(angle)
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-gcode.append("H0\nM5\nG0Z1\n")
-gcode.append("G0X0Y0\nM30")
-
-with open("/home/kontomeo/Desktop/JURASSIC_TREX.nc", 'w') as f:
-    f.write("\n".join(gcode))
-
-# Backup
-shutil.copy("/home/kontomeo/Desktop/JURASSIC_TREX.nc",
-            "/home/kontomeo/Desktop/BROK_BACKUPS/v5_teeth_added.nc")
-shutil.copy("/home/kontomeo/Desktop/BROK_TEETH_ADDED.png",
-            "/home/kontomeo/Desktop/BROK_BACKUPS/v5_teeth_added.png")
+# Written straight to a buffered file; one joined block per cut
+def build_and_save_gcode():
+    """Write the G-code file, return the number of cuts"""
+    cut_num = 0
+
+    with open("/home/kontomeo/Desktop/JURASSIC_TREX.nc", 'w', buffering=1 << 20) as f:
+        w = f.write
+        w("(BROK CNC - TEETH CONNECTED TO JAW)\n")
+        w("(7 upper, 4 lower, 15% bigger)\n")
+        w("(BEVEL LAW ENFORCED)\n")
+        w("(Feed:47 Pierce:0.148 Cut:0.059)\n")
+        w("(v1.6-af)\n")
+        w("G20G90\n")
+        w("G0X0.Y0.\n")
+        w("H0\n")
+        w("\n")
+
+        # Holes first - CCW (inside cuts)
+        for hole in holes:
+            if len(hole) < 10:
+                continue
+            cut_num += 1
+            w(f"(=== CUT {cut_num}: HOLE - CCW ===)\n")
+            sx, sy = hole[0]
+            w(f"G0X{sx-0.15:.4f}Y{sy:.4f}\n")
+            w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+            w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+            w("\n".join(map(G1_FMT, map(tuple, hole.tolist()))))
+            w("\nH0\nM5\nG0Z1\n\n")
+
+        # Skeleton with teeth - CCW
+        cut_num += 1
+        w(f"(=== CUT {cut_num}: SKELETON WITH TEETH - CCW ===)\n")
+        sx, sy = skeleton_teeth[0]
+        w(f"G0X{sx-0.15:.4f}Y{sy:.4f}\n")
+        w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+        w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+        w("\n".join(map(G1_FMT, map(tuple, skeleton_teeth.tolist()))))
+        w("\n" + G1_FMT(tuple(skeleton_teeth[0].tolist())))
+        w("\nH0\nM5\nG0Z1\n\n")
+
+        # Ring - CW (outside cut)
+        cut_num += 1
+        w(f"(=== CUT {cut_num}: 12\" RING - CW ===)\n")
+        w(f"G0X{6.75+6.2:.4f}Y6.7500\n")
+        w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+        w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+        angles = np.linspace(0, -2 * np.pi, 121)
+        ring = np.column_stack([6.75 + 6.0 * np.cos(angles), 6.75 + 6.0 * np.sin(angles)])
+        w("\n".join(map(G1_FMT, map(tuple, ring.tolist()))))
+        w("\nH0\nM5\nG0Z1\n\n")
+        w("G0X0Y0\nM30")
+
+    return cut_num
+
+# Image and G-code stages are independent: overlap them
+with ThreadPoolExecutor(max_workers=2) as ex:
+    image_job = ex.submit(build_and_save_image)
+    gcode_job = ex.submit(build_and_save_gcode)
+    image_job.result()
+    cut_num = gcode_job.result()
+
+# Backup (copyfile goes through os.sendfile on Linux; no hardlinks since
+# JURASSIC_TREX.nc is rewritten in place by the other tools)
+shutil.copyfile("/home/kontomeo/Desktop/JURASSIC_TREX.nc",
+                "/home/kontomeo/Desktop/BROK_BACKUPS/v5_teeth_added.nc")
+shutil.copyfile("/home/kontomeo/Desktop/BROK_TEETH_ADDED.png",
+                "/home/kontomeo/Desktop/BROK_BACKUPS/v5_teeth_added.png")
 
 print(f"[SAVED] G-code: {cut_num} cuts")
 print(f"[BACKUP] v5_teeth_added saved")
@@ -22,8 +22,35 @@ from PIL import Image, ImageDraw, ImageFont
 import math
 import json
 import os
+import io
+import sys
+import multiprocessing as mp
+
+FOUR_PI = 4.0 * math.pi
+MAX_CIRCULARITY = 0.6  # silhouette must be less round than this (excludes the ring)
+
+# Above this many skeleton points, jaw box queries go through a Z-order index
+MORTON_MIN_POINTS = 4000
+
+
+def _spread_bits(v):
+    """Spread the low 16 bits of v so there is a zero bit between each"""
+    v = v.astype(np.uint32) & 0x0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def _morton_key(qx, qy):
+    """Interleave 16-bit grid coords into a 32-bit Z-order (Morton) key"""
+    return _spread_bits(np.asarray(qx)) | (_spread_bits(np.asarray(qy)) << 1)
 
 class BrokAutonomous:
+    # (title, small) TrueType fonts, loaded once and shared by all instances
+    _fonts = None
+
     def __init__(self):
         print("="*70)
         print("BROK CNC - AUTONOMOUS AI SYSTEM v2 (TUNED)")
@@ -39,11 +66,20 @@ class BrokAutonomous:
         self.margin = 80
         self.scale = (self.img_size - 2*self.margin) / self.workspace
 
-        # Design state
-        self.skeleton = []
+        # Background + 0.25" grid, built once and copied per render
+        bg = np.full((self.img_size, self.img_size, 3), 0x0a, dtype=np.uint8)
+        grid = self.margin + (np.arange(57) * 0.25 * self.scale).astype(int)
+        span = slice(self.margin, self.img_size - self.margin + 1)
+        bg[span, grid] = 0x1a
+        bg[grid, span] = 0x1a
+        self._grid_bg = Image.fromarray(bg)
+
+        # Design state - skeleton is an (N,2) float64 array in inches
+        self.skeleton = np.empty((0, 2))
         self.holes = []
         self.teeth_upper = []
         self.teeth_lower = []
+        self._morton = None  # (skeleton, sorted keys, order) for large skeletons
 
         # TUNED PARAMETERS - learned from corrections
         self.jaw_params = {
@@ -77,6 +113,20 @@ class BrokAutonomous:
         print(f"  Upper: X[{self.jaw_params['upper_x_min']}-{self.jaw_params['upper_x_max']}] Y[{self.jaw_params['upper_y_min']}-{self.jaw_params['upper_y_max']}]")
         print(f"  Lower: X[{self.jaw_params['lower_x_min']}-{self.jaw_params['lower_x_max']}] Y[{self.jaw_params['lower_y_min']}-{self.jaw_params['lower_y_max']}]")
 
+    @classmethod
+    def _load_fonts(cls):
+        """Load the render fonts on first use"""
+        if cls._fonts is None:
+            try:
+                cls._fonts = (
+                    ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24),
+                    ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
+                )
+            except OSError:
+                default = ImageFont.load_default()
+                cls._fonts = (default, default)
+        return cls._fonts
+
     def px(self, x, y):
         """Inches to pixels"""
         return (
@@ -84,15 +134,44 @@ class BrokAutonomous:
             self.img_size - self.margin - int(y * self.scale)
         )
 
+    def _px_array(self, pts):
+        """Vectorized px(): (N,2) inches -> (N,2) int32 pixels"""
+        a = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        out = np.empty((len(a), 2), np.int32)
+        out[:, 0] = self.margin + (a[:, 0] * self.scale).astype(np.int32)
+        out[:, 1] = self.img_size - self.margin - (a[:, 1] * self.scale).astype(np.int32)
+        return out
+
+    @staticmethod
+    def _limit_edge_length(pts, max_len):
+        """Insert evenly spaced points so no closed-polygon edge exceeds max_len"""
+        nxt = np.roll(pts, -1, axis=0)
+        lengths = np.hypot(*(nxt - pts).T)
+        splits = np.maximum(1, np.ceil(lengths / max_len).astype(int))
+        seg = np.repeat(np.arange(len(pts)), splits)
+        t = (np.arange(len(seg)) - np.repeat(np.cumsum(splits) - splits, splits)) / splits[seg]
+        return pts[seg] + (nxt[seg] - pts[seg]) * t[:, None]
+
+    def _to_workspace(self, cnt, h):
+        """OpenCV (N,1,2) pixel contour -> (N,2) workspace inches"""
+        pts = cnt.reshape(-1, 2)
+        out = np.empty((len(pts), 2), dtype=np.float64)
+        np.multiply(pts[:, 0], self.src_scale, out=out[:, 0])
+        out[:, 0] += self.src_offset[0]
+        np.multiply(h - pts[:, 1], self.src_scale, out=out[:, 1])
+        out[:, 1] += self.src_offset[1]
+        return out
+
     def load_and_trace(self, image_path):
         """Step 1: Load image and trace contours"""
         print(f"\n[STEP 1] Loading and tracing: {image_path}")
 
-        img = cv2.imread(image_path)
-        if img is None:
+        # Decode straight to one channel - no BGR buffer, no cvtColor pass
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
             return False, "Cannot load image"
 
-        h, w = img.shape[:2]
+        h, w = gray.shape
         self.source_h, self.source_w = h, w
 
         # Scale to fit
@@ -104,8 +183,9 @@ class BrokAutonomous:
         )
 
         # Threshold and find contours
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         _, mask = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY_INV)
+        # CHAIN_APPROX_NONE on purpose: silhouette ranking uses len(cnt) and
+        # holes are sampled with cnt[::3], both assuming one point per edge pixel
         contours, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
 
         # Find main silhouette
@@ -114,84 +194,111 @@ class BrokAutonomous:
         for cnt in contours:
             area = cv2.contourArea(cnt)
             perim = cv2.arcLength(cnt, True)
+            # circularity 4*pi*A/P^2 < 0.6, rearranged to avoid the divide
             if perim > 0:
-                circ = 4 * math.pi * area / (perim * perim)
-                if circ < 0.6 and len(cnt) > best_len:
+                if FOUR_PI * area < MAX_CIRCULARITY * perim * perim and len(cnt) > best_len:
                     best = cnt
                     best_len = len(cnt)
 
         if best is None:
             return False, "No suitable contour found"
 
-        # Convert to workspace coords
-        self.skeleton = []
-        for pt in best:
-            px, py = pt[0]
-            x = px * self.src_scale + self.src_offset[0]
-            y = (h - py) * self.src_scale + self.src_offset[1]
-            self.skeleton.append([x, y])
+        # Simplify with Douglas-Peucker (drops staircase points on straight
+        # runs, keeps curve detail), then re-split long edges so jaw lines
+        # keep enough candidate points for tooth placement
+        step = max(1, len(best) // 800)
+        best = cv2.approxPolyDP(best, 1.0, True)
+        best = self._limit_edge_length(best.reshape(-1, 2), 2 * step)
 
-        # Simplify - but keep more points for better tooth placement
-        step = max(1, len(self.skeleton) // 800)  # Doubled resolution
-        self.skeleton = self.skeleton[::step]
+        # Convert to workspace coords
+        self.skeleton = self._to_workspace(best, h)
 
         # Find holes
         self.holes = []
         if hierarchy is not None:
-            for i, (cnt, hier) in enumerate(zip(contours, hierarchy[0])):
-                if hier[3] >= 0:
-                    area = cv2.contourArea(cnt)
-                    if 2000 < area < 30000:
-                        hole_pts = []
-                        for pt in cnt[::3]:
-                            px, py = pt[0]
-                            x = px * self.src_scale + self.src_offset[0]
-                            y = (h - py) * self.src_scale + self.src_offset[1]
-                            hole_pts.append([x, y])
-
-                        xs = [p[0] for p in hole_pts]
-                        if 1 < min(xs) < max(xs) < 13:
-                            self.holes.append(hole_pts)
+            # Only child contours (with a parent) can be holes
+            children = np.nonzero(hierarchy[0][:, 3] >= 0)[0]
+            for i in children:
+                cnt = contours[i]
+                area = cv2.contourArea(cnt)
+                if 2000 < area < 30000:
+                    hole_pts = self._to_workspace(cnt[::3], h)
+
+                    xmin = hole_pts[:, 0].min()
+                    xmax = hole_pts[:, 0].max()
+                    if 1 < xmin < xmax < 13:
+                        self.holes.append(hole_pts)
 
         print(f"[TRACE] Skeleton: {len(self.skeleton)} points")
         print(f"[TRACE] Holes: {len(self.holes)}")
 
         return True, "Trace complete"
 
+    def _sort_by_x(self, indices):
+        """Skeleton indices ordered by X (back to front of jaw), stable"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return indices[np.argsort(self.skeleton[indices, 0], kind='stable')]
+
+    def _quantize(self, x, y):
+        """Inches -> 16-bit workspace grid coords (monotonic, clamped)"""
+        q = lambda v: np.clip(np.asarray(v) / self.workspace * 65535, 0, 65535).astype(np.uint32)
+        return q(x), q(y)
+
+    def _box_query(self, x_lo, x_hi, y_lo, y_hi):
+        """Ascending skeleton indices strictly inside the box"""
+        sk = self.skeleton
+        if len(sk) > MORTON_MIN_POINTS:
+            # Z-order is monotonic in x and y, so every point in the box has a
+            # key between the keys of its two corners: two binary searches
+            if self._morton is None or self._morton[0] is not sk:
+                keys = _morton_key(*self._quantize(sk[:, 0], sk[:, 1]))
+                order = np.argsort(keys, kind='stable')
+                self._morton = (sk, keys[order], order)
+            _, keys, order = self._morton
+            lo = np.searchsorted(keys, _morton_key(*self._quantize(x_lo, y_lo)), 'left')
+            hi = np.searchsorted(keys, _morton_key(*self._quantize(x_hi, y_hi)), 'right')
+            cand = np.sort(order[lo:hi])
+        else:
+            cand = np.arange(len(sk))
+
+        x = sk[cand, 0]
+        y = sk[cand, 1]
+        return cand[(x > x_lo) & (x < x_hi) & (y > y_lo) & (y < y_hi)]
+
     def find_jaw_points(self):
-        """Find jaw line points using tuned parameters"""
+        """Find jaw line points using tuned parameters, each jaw sorted by X"""
         p = self.jaw_params
 
-        upper_jaw_idx = []
-        lower_jaw_idx = []
+        # Upper jaw detection (tuned bounds)
+        upper_jaw_idx = self._box_query(p['upper_x_min'], p['upper_x_max'],
+                                        p['upper_y_min'], p['upper_y_max'])
 
-        for i, (x, y) in enumerate(self.skeleton):
-            # Upper jaw detection (tuned bounds)
-            if (p['upper_x_min'] < x < p['upper_x_max'] and
-                p['upper_y_min'] < y < p['upper_y_max']):
-                upper_jaw_idx.append(i)
+        # Lower jaw detection (tuned bounds) - upper wins on overlap
+        lower_jaw_idx = self._box_query(p['lower_x_min'], p['lower_x_max'],
+                                        p['lower_y_min'], p['lower_y_max'])
+        lower_jaw_idx = np.setdiff1d(lower_jaw_idx, upper_jaw_idx, assume_unique=True)
 
-            # Lower jaw detection (tuned bounds)
-            elif (p['lower_x_min'] < x < p['lower_x_max'] and
-                  p['lower_y_min'] < y < p['lower_y_max']):
-                lower_jaw_idx.append(i)
+        # Sort each jaw by X in the same pass, so tooth selection never re-sorts
+        upper_jaw_idx = self._sort_by_x(upper_jaw_idx)
+        lower_jaw_idx = self._sort_by_x(lower_jaw_idx)
 
         return upper_jaw_idx, lower_jaw_idx
 
     def select_tooth_positions(self, jaw_indices, count):
-        """Select evenly spaced tooth positions along jaw line - FIXED spacing"""
+        """Select evenly spaced tooth positions along jaw line - FIXED spacing
+        jaw_indices must already be sorted by X (see find_jaw_points)"""
         if len(jaw_indices) < count:
             print(f"[WARN] Not enough jaw points: {len(jaw_indices)} < {count}")
-            return jaw_indices
+            return np.asarray(jaw_indices).tolist()
 
         p = self.jaw_params
 
-        # Sort by X position (back to front of jaw)
-        sorted_idx = sorted(jaw_indices, key=lambda i: self.skeleton[i][0])
+        sorted_idx = np.asarray(jaw_indices)
+        xs = self.skeleton[sorted_idx, 0]
 
         # Get X range of jaw points
-        x_min = self.skeleton[sorted_idx[0]][0]
-        x_max = self.skeleton[sorted_idx[-1]][0]
+        x_min = xs[0]
+        x_max = xs[-1]
         x_range = x_max - x_min
 
         # Calculate ideal X positions (evenly spaced)
@@ -200,37 +307,30 @@ class BrokAutonomous:
         x_end = x_max - x_range * p['skip_front']
         x_span = x_end - x_start
 
-        ideal_positions = []
-        for i in range(count):
-            if count > 1:
-                ideal_x = x_start + (x_span * i / (count - 1))
-            else:
-                ideal_x = (x_start + x_end) / 2
-            ideal_positions.append(ideal_x)
-
-        # Find closest skeleton point to each ideal position
-        selected = []
-        used_indices = set()
+        if count > 1:
+            ideal_positions = x_start + x_span * np.arange(count) / (count - 1)
+        else:
+            ideal_positions = np.array([(x_start + x_end) / 2])
 
-        for ideal_x in ideal_positions:
-            best_idx = None
-            best_dist = float('inf')
+        # Closest jaw point to each ideal position: binary search, then
+        # compare the two neighbours (left wins ties, first of equal Xs)
+        pos = np.clip(np.searchsorted(xs, ideal_positions), 1, len(xs) - 1)
+        left_closer = np.abs(xs[pos - 1] - ideal_positions) <= np.abs(xs[pos] - ideal_positions)
+        nearest = np.where(left_closer, np.searchsorted(xs, xs[pos - 1]), pos)
 
-            for idx in sorted_idx:
-                if idx in used_indices:
-                    continue
-                x = self.skeleton[idx][0]
-                dist = abs(x - ideal_x)
-                if dist < best_dist:
-                    best_dist = dist
-                    best_idx = idx
+        # Monotonic sweep: ideal positions increase, so each tooth takes the
+        # nearest point after the previous pick (one tooth per point),
+        # leaving enough points for the teeth still to place
+        selected = []
+        j = 0
 
-            if best_idx is not None:
-                selected.append(best_idx)
-                used_indices.add(best_idx)
+        for i, k in enumerate(nearest.tolist()):
+            k = min(max(k, j), len(xs) - (count - i))
+            selected.append(int(sorted_idx[k]))
+            j = k + 1
 
         print(f"[SPACING] Ideal X positions: {[f'{x:.2f}' for x in ideal_positions]}")
-        print(f"[SPACING] Actual X positions: {[f'{self.skeleton[i][0]:.2f}' for i in selected]}")
+        print(f"[SPACING] Actual X positions: {[f'{x:.2f}' for x in self.skeleton[selected, 0]]}")
 
         return selected
 
@@ -257,22 +357,23 @@ class BrokAutonomous:
         upper_jaw_idx, lower_jaw_idx = self.find_jaw_points()
         print(f"[JAW] Found: {len(upper_jaw_idx)} upper, {len(lower_jaw_idx)} lower points")
 
+        x = self.skeleton[:, 0]
+        y = self.skeleton[:, 1]
+
         if len(upper_jaw_idx) < upper_count:
             print(f"[WARN] Expanding upper jaw search...")
             # Expand bounds slightly
-            for i, (x, y) in enumerate(self.skeleton):
-                if (p['upper_x_min']-0.5 < x < p['upper_x_max']+0.5 and
-                    p['upper_y_min']-0.3 < y < p['upper_y_max']+0.3):
-                    if i not in upper_jaw_idx:
-                        upper_jaw_idx.append(i)
+            wide = ((x > p['upper_x_min']-0.5) & (x < p['upper_x_max']+0.5) &
+                    (y > p['upper_y_min']-0.3) & (y < p['upper_y_max']+0.3))
+            wide[upper_jaw_idx] = False
+            upper_jaw_idx = self._sort_by_x(np.concatenate((upper_jaw_idx, np.nonzero(wide)[0])))
 
         if len(lower_jaw_idx) < lower_count:
             print(f"[WARN] Expanding lower jaw search...")
-            for i, (x, y) in enumerate(self.skeleton):
-                if (p['lower_x_min']-0.5 < x < p['lower_x_max']+0.3 and
-                    p['lower_y_min']-0.2 < y < p['lower_y_max']+0.2):
-                    if i not in lower_jaw_idx:
-                        lower_jaw_idx.append(i)
+            wide = ((x > p['lower_x_min']-0.5) & (x < p['lower_x_max']+0.3) &
+                    (y > p['lower_y_min']-0.2) & (y < p['lower_y_max']+0.2))
+            wide[lower_jaw_idx] = False
+            lower_jaw_idx = self._sort_by_x(np.concatenate((lower_jaw_idx, np.nonzero(wide)[0])))
 
         print(f"[JAW] After expansion: {len(upper_jaw_idx)} upper, {len(lower_jaw_idx)} lower")
 
@@ -282,27 +383,25 @@ class BrokAutonomous:
 
         # Validate and report positions
         print(f"\n[TEETH] Upper jaw positions:")
-        for idx in upper_positions:
-            x, y = self.skeleton[idx]
+        for x, y in self.skeleton[upper_positions].tolist():
             valid = self.validate_tooth_position(x, y, 'upper')
             status = "✓" if valid else "✗"
             print(f"  {status} ({x:.2f}, {y:.2f})")
 
         print(f"\n[TEETH] Lower jaw positions:")
-        for idx in lower_positions:
-            x, y = self.skeleton[idx]
+        for x, y in self.skeleton[lower_positions].tolist():
             valid = self.validate_tooth_position(x, y, 'lower')
             status = "✓" if valid else "✗"
             print(f"  {status} ({x:.2f}, {y:.2f})")
 
-        # Combine and sort by index (descending for insertion)
+        # Combine and sort by index (ascending for a single merge pass)
         all_teeth = []
         for idx in upper_positions:
             all_teeth.append((idx, 'down', 'upper'))
         for idx in lower_positions:
             all_teeth.append((idx, 'up', 'lower'))
 
-        all_teeth.sort(key=lambda x: x[0], reverse=True)
+        all_teeth.sort(key=lambda x: x[0])
 
         # Insert teeth into skeleton
         self.teeth_upper = []
@@ -310,10 +409,15 @@ class BrokAutonomous:
 
         tooth_w = p['tooth_w']
         tooth_h = p['tooth_h']
+        half_w = tooth_w / 2
+
+        # Walk the skeleton once: untouched spans + tooth triangles,
+        # joined by a single concatenate at the end
+        segments = []
+        cursor = 0
 
         for idx, direction, jaw_type in all_teeth:
             x, y = self.skeleton[idx]
-            half_w = tooth_w / 2
 
             if direction == 'down':
                 tooth_pts = [
@@ -331,7 +435,12 @@ class BrokAutonomous:
                 self.teeth_lower.append((x, y))
 
             # Replace single point with tooth triangle
-            self.skeleton = self.skeleton[:idx] + tooth_pts + self.skeleton[idx+1:]
+            segments.append(self.skeleton[cursor:idx])
+            segments.append(np.array(tooth_pts))
+            cursor = idx + 1
+
+        segments.append(self.skeleton[cursor:])
+        self.skeleton = np.concatenate(segments)
 
         print(f"\n[TEETH] Integrated: {len(self.teeth_upper)} upper, {len(self.teeth_lower)} lower")
         print(f"[TEETH] New skeleton: {len(self.skeleton)} points")
@@ -340,34 +449,26 @@ class BrokAutonomous:
 
     def render(self, filename):
         """Render current state to image"""
-        img = Image.new('RGB', (self.img_size, self.img_size), '#0a0a0a')
+        img = self._grid_bg.copy()
         draw = ImageDraw.Draw(img)
 
-        # Grid
-        for i in range(57):
-            p = self.margin + int(i * 0.25 * self.scale)
-            draw.line([(p, self.margin), (p, self.img_size - self.margin)], fill='#1a1a1a')
-            draw.line([(self.margin, p), (self.img_size - self.margin, p)], fill='#1a1a1a')
-
         # Skeleton with integrated teeth
-        if self.skeleton:
-            pts = [self.px(x, y) for x, y in self.skeleton]
+        if len(self.skeleton):
+            pts = [tuple(r) for r in self._px_array(self.skeleton).tolist()]
             draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=2)
 
         # Holes in CYAN
         for hole in self.holes:
-            hpts = [self.px(x, y) for x, y in hole]
+            hpts = [tuple(r) for r in self._px_array(hole).tolist()]
             if len(hpts) > 2:
                 draw.polygon(hpts, outline='#4ecdc4', fill='#0a2020', width=2)
 
         # Mark teeth positions
-        for x, y in self.teeth_upper:
-            tp = self.px(x, y)
-            draw.ellipse([tp[0]-5, tp[1]-5, tp[0]+5, tp[1]+5], fill='#00ff00')
+        for tx, ty in self._px_array(self.teeth_upper).tolist():
+            draw.ellipse([tx-5, ty-5, tx+5, ty+5], fill='#00ff00')
 
-        for x, y in self.teeth_lower:
-            tp = self.px(x, y)
-            draw.ellipse([tp[0]-5, tp[1]-5, tp[0]+5, tp[1]+5], fill='#ffff00')
+        for tx, ty in self._px_array(self.teeth_lower).tolist():
+            draw.ellipse([tx-5, ty-5, tx+5, ty+5], fill='#ffff00')
 
         # Ring
         cx, cy = self.px(self.center[0], self.center[1])
@@ -387,11 +488,7 @@ class BrokAutonomous:
         draw.rectangle([ul[0], ul[1], lr[0], lr[1]], outline='#ffff00', width=1)
 
         # Info
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-            small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
-        except:
-            font = small = ImageFont.load_default()
+        font, small = self._load_fonts()
 
         draw.text((self.img_size//2, 25), f"BROK v2 (TUNED) - Iteration {self.iteration}",
                   fill='#00ff00', font=font, anchor='mm')
@@ -413,12 +510,26 @@ class BrokAutonomous:
         img.save(filename)
         return filename
 
+    def _check_teeth_bounds(self, teeth, jaw_type, label):
+        """Batch bounds check of tooth centres against the jaw box"""
+        if not teeth:
+            return
+        jp = self.jaw_params
+        t = np.asarray(teeth, dtype=np.float64)
+        bad_x = ~((jp[f'{jaw_type}_x_min'] < t[:, 0]) & (t[:, 0] < jp[f'{jaw_type}_x_max']))
+        bad_y = ~((jp[f'{jaw_type}_y_min'] < t[:, 1]) & (t[:, 1] < jp[f'{jaw_type}_y_max']))
+
+        for i in np.nonzero(bad_x | bad_y)[0]:
+            if bad_x[i]:
+                self.problems.append(f"{label} tooth {i+1} X out of range: {t[i, 0]:.2f}")
+            if bad_y[i]:
+                self.problems.append(f"{label} tooth {i+1} Y out of range: {t[i, 1]:.2f}")
+
     def analyze_design(self, image_path):
         """Step 3: Validate design"""
         print(f"\n[STEP 3] Validating design...")
 
         self.problems = []
-        jp = self.jaw_params
 
         # Check teeth counts
         if len(self.teeth_upper) != 7:
@@ -427,28 +538,18 @@ class BrokAutonomous:
         if len(self.teeth_lower) != 4:
             self.problems.append(f"Lower teeth: {len(self.teeth_lower)} (need 4)")
 
-        # Validate upper teeth positions
-        for i, (x, y) in enumerate(self.teeth_upper):
-            if not (jp['upper_x_min'] < x < jp['upper_x_max']):
-                self.problems.append(f"Upper tooth {i+1} X out of range: {x:.2f}")
-            if not (jp['upper_y_min'] < y < jp['upper_y_max']):
-                self.problems.append(f"Upper tooth {i+1} Y out of range: {y:.2f}")
-
-        # Validate lower teeth positions
-        for i, (x, y) in enumerate(self.teeth_lower):
-            if not (jp['lower_x_min'] < x < jp['lower_x_max']):
-                self.problems.append(f"Lower tooth {i+1} X out of range: {x:.2f}")
-            if not (jp['lower_y_min'] < y < jp['lower_y_max']):
-                self.problems.append(f"Lower tooth {i+1} Y out of range: {y:.2f}")
+        # Validate upper/lower teeth positions
+        self._check_teeth_bounds(self.teeth_upper, 'upper', 'Upper')
+        self._check_teeth_bounds(self.teeth_lower, 'lower', 'Lower')
 
         # Check teeth are evenly spaced (70% tolerance - some variation due to shape)
         if len(self.teeth_upper) >= 2:
-            upper_xs = sorted([x for x, y in self.teeth_upper])
-            gaps = [upper_xs[i+1] - upper_xs[i] for i in range(len(upper_xs)-1)]
-            avg_gap = sum(gaps) / len(gaps)
-            for i, gap in enumerate(gaps):
-                if abs(gap - avg_gap) > avg_gap * 0.7:  # 70% tolerance for natural shape variation
-                    self.problems.append(f"Upper teeth uneven gap at {i}: {gap:.2f} vs avg {avg_gap:.2f}")
+            upper_xs = np.sort(np.asarray(self.teeth_upper, dtype=np.float64)[:, 0])
+            gaps = np.diff(upper_xs)
+            avg_gap = gaps.mean()
+            uneven = np.abs(gaps - avg_gap) > avg_gap * 0.7  # 70% tolerance for natural shape variation
+            for i in np.nonzero(uneven)[0]:
+                self.problems.append(f"Upper teeth uneven gap at {i}: {gaps[i]:.2f} vs avg {avg_gap:.2f}")
 
         if self.problems:
             print(f"[VALIDATE] Found {len(self.problems)} problems:")
@@ -459,19 +560,25 @@ class BrokAutonomous:
             print("[VALIDATE] Design verified OK")
             return True
 
+    def _write_g1(self, buf, pts):
+        """Write (N,2) points as G1 feed moves, formatted in one savetxt call"""
+        np.savetxt(buf, np.asarray(pts, dtype=np.float64).reshape(-1, 2), fmt="G1X%.4fY%.4fF47")
+
     def generate_gcode(self, output_path):
         """Generate G-code"""
         print(f"\n[GCODE] Generating...")
 
-        gcode = []
-        gcode.append("(BROK CNC v2 - AUTONOMOUS TUNED)")
-        gcode.append(f"(Teeth: {len(self.teeth_upper)} upper, {len(self.teeth_lower)} lower)")
-        gcode.append("(BEVEL LAW: Inside=CCW, Outside=CW)")
-        gcode.append("(Feed:47 Pierce:0.148 Cut:0.059)")
-        gcode.append("G20G90")
-        gcode.append("G0X0.Y0.")
-        gcode.append("H0")
-        gcode.append("")
+        # One growing text buffer instead of a list of per-line strings
+        buf = io.StringIO()
+        w = buf.write
+        w("(BROK CNC v2 - AUTONOMOUS TUNED)\n")
+        w(f"(Teeth: {len(self.teeth_upper)} upper, {len(self.teeth_lower)} lower)\n")
+        w("(BEVEL LAW: Inside=CCW, Outside=CW)\n")
+        w("(Feed:47 Pierce:0.148 Cut:0.059)\n")
+        w("G20G90\n")
+        w("G0X0.Y0.\n")
+        w("H0\n")
+        w("\n")
 
         cut_num = 0
 
@@ -480,43 +587,41 @@ class BrokAutonomous:
             if len(hole) < 10:
                 continue
             cut_num += 1
-            gcode.append(f"(=== CUT {cut_num}: HOLE - CCW ===)")
+            w(f"(=== CUT {cut_num}: HOLE - CCW ===)\n")
             sx, sy = hole[0]
-            gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-            gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-            gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-            for x, y in hole:
-                gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-            gcode.append("H0\nM5\nG0Z1\n")
+            w(f"G0X{sx-0.15:.4f}Y{sy:.4f}\n")
+            w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+            w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+            self._write_g1(buf, hole)
+            w("H0\nM5\nG0Z1\n\n")
 
         # Skeleton - CCW
         cut_num += 1
-        gcode.append(f"(=== CUT {cut_num}: SKELETON+TEETH - CCW ===)")
+        w(f"(=== CUT {cut_num}: SKELETON+TEETH - CCW ===)\n")
         sx, sy = self.skeleton[0]
-        gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-        gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-        gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-        for x, y in self.skeleton:
-            gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-        gcode.append(f"G1X{self.skeleton[0][0]:.4f}Y{self.skeleton[0][1]:.4f}F47")
-        gcode.append("H0\nM5\nG0Z1\n")
+        w(f"G0X{sx-0.15:.4f}Y{sy:.4f}\n")
+        w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+        w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+        self._write_g1(buf, self.skeleton)
+        w(f"G1X{self.skeleton[0, 0]:.4f}Y{self.skeleton[0, 1]:.4f}F47\n")
+        w("H0\nM5\nG0Z1\n\n")
 
         # Ring - CW
         cut_num += 1
-        gcode.append(f"(=== CUT {cut_num}: 12\" RING - CW ===)")
-        gcode.append(f"G0X{self.center[0]+self.ring_dia/2+0.2:.4f}Y{self.center[1]:.4f}")
-        gcode.append("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0")
-        gcode.append("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1")
-        for i in range(121):
-            angle = -2 * math.pi * i / 120
-            x = self.center[0] + (self.ring_dia/2) * math.cos(angle)
-            y = self.center[1] + (self.ring_dia/2) * math.sin(angle)
-            gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-        gcode.append("H0\nM5\nG0Z1\n")
-        gcode.append("G0X0Y0\nM30")
+        w(f"(=== CUT {cut_num}: 12\" RING - CW ===)\n")
+        w(f"G0X{self.center[0]+self.ring_dia/2+0.2:.4f}Y{self.center[1]:.4f}\n")
+        w("G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\n")
+        w("G0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n")
+        ang = np.linspace(0, -2 * np.pi, 121)
+        self._write_g1(buf, np.column_stack((
+            self.center[0] + (self.ring_dia/2) * np.cos(ang),
+            self.center[1] + (self.ring_dia/2) * np.sin(ang)
+        )))
+        w("H0\nM5\nG0Z1\n\n")
+        w("G0X0Y0\nM30")
 
         with open(output_path, 'w') as f:
-            f.write("\n".join(gcode))
+            f.write(buf.getvalue())
 
         print(f"[GCODE] Saved: {output_path}")
         return True
@@ -561,7 +666,34 @@ class BrokAutonomous:
         return valid
 
 
+def _init_worker():
+    # One OpenCV thread per process - the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def _run_one(job):
+    """Pool worker: run the full pipeline for one image into its own folder"""
+    source_image, output_dir = job
+    os.makedirs(output_dir, exist_ok=True)
+    valid = BrokAutonomous().run(source_image, output_dir)
+    return {'source': source_image, 'output_dir': output_dir, 'valid': valid}
+
+
+def run_batch(sources, output_root="/home/kontomeo/Desktop/BROK_BATCH", workers=None):
+    """Run the pipeline over many images in parallel, one process per image.
+    Each image writes BROK_FINAL.png / JURASSIC_TREX.nc under output_root/<image name>/"""
+    jobs = [(src, os.path.join(output_root, os.path.splitext(os.path.basename(src))[0]))
+            for src in sources]
+    with mp.Pool(workers or os.cpu_count(), initializer=_init_worker) as pool:
+        return pool.map(_run_one, jobs)
+
+
 if __name__ == "__main__":
-    brok = BrokAutonomous()
-    source = "/home/kontomeo/Desktop/jp_logo__tyrannosaurus_rex_by_titanuspixel55_derr4aw-pre.png"
-    brok.run(source)
+    if len(sys.argv) > 1:
+        # python3 brok_autonomous.py img1.png img2.png ... -> parallel batch
+        for r in run_batch(sys.argv[1:]):
+            print(f"{'VERIFIED' if r['valid'] else 'HAS ISSUES'}: {r['source']} -> {r['output_dir']}")
+    else:
+        brok = BrokAutonomous()
+        source = "/home/kontomeo/Desktop/jp_logo__tyrannosaurus_rex_by_titanuspixel55_derr4aw-pre.png"
+        brok.run(source)
@@ -13,13 +13,37 @@ BEVEL LAW (CW Swirl Plasma):
 - Short lines/artwork: Both sides retained = acceptable (no choice)
 - User can override, but this is STRICT DEFAULT
 """
-import re
+import os
 import math
+import hashlib
+import logging
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from _gcode_io import load_skeleton_holes
+
+# Diagnostics go to the "brok" logger; set BROK_DEBUG=1 to see them
+logging.basicConfig(format="%(message)s")
+log = logging.getLogger("brok")
+log.setLevel(logging.DEBUG if os.environ.get("BROK_DEBUG") else logging.INFO)
+
+def g1_block(pts):
+    """All G1 moves of a contour, formatted by one %-format call"""
+    # Reversed contours arrive as [::-1] views; copy to C order once here
+    a = np.ascontiguousarray(pts, dtype=np.float64)
+    return ("G1X%.4fY%.4fF47\n" * len(a)) % tuple(a.ravel().tolist())
+
+@lru_cache(maxsize=8)
+def _font(path, size):
+    """TrueType fonts are loaded once per (path, size)"""
+    return ImageFont.truetype(path, size)
 
 class BrokCNC:
     """BROK CNC with GPS grid + BEVEL LAW"""
 
+    __slots__ = ('grid_size', 'workpiece_size', 'scale', 'points', 'holes',
+                 'features', 'bevel_override', '_analyze_key')
+
     # BEVEL LAW CONSTANTS
     BEVEL_LAW = """
     ╔═══════════════════════════════════════════════════════╗
@@ -32,14 +56,29 @@ class BrokCNC:
     ╚═══════════════════════════════════════════════════════╝
     """
 
+    # Fixed G-code blocks: program header, touch-off + pierce before
+    # every cut, torch off + retract after it
+    _HEADER = ("(BROK CNC - BEVEL LAW ENFORCED)\n"
+               "(Inside cuts: CCW = square on workpiece)\n"
+               "(Outside cuts: CW = square on workpiece)\n"
+               "(Feed:47 Pierce:0.148 Cut:0.059)\n"
+               "(v1.6-af)\n"
+               "G20G90\n"
+               "G0X0.Y0.\n"
+               "H0\n"
+               "\n")
+    _PIERCE_BLOCK = "G92Z0\nG38.2Z-5F50\nG38.4Z0.5F25\nG92Z0\nG0Z0.148\nM3\nG4P0.70\nG0Z0.059\nH1\n"
+    _END_BLOCK = "H0\nM5\nG0Z1\n\n"
+
     def __init__(self):
         self.grid_size = 0.5  # Half-inch grid squares
         self.workpiece_size = 14.0  # 14" workspace
         self.scale = 100  # pixels per inch for visualization
-        self.points = []
+        self.points = np.empty((0, 2), dtype=np.float64)  # (N, 2) x,y
         self.holes = []
         self.features = {}
         self.bevel_override = False  # User can override bevel law
+        self._analyze_key = None  # digest of the points last analyzed
 
     def print_bevel_law(self):
         """Display the bevel law"""
@@ -47,44 +86,8 @@ class BrokCNC:
 
     def load_gcode(self, filepath):
         """Load G-code and extract skeleton + holes"""
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-
-        self.points = []
-        self.holes = []
-        current_hole = []
-        in_skeleton = False
-        in_hole = False
-
-        for line in lines:
-            line = line.strip()
-
-            if 'HOLE' in line and 'CUT' in line:
-                if current_hole:
-                    self.holes.append(current_hole)
-                current_hole = []
-                in_hole = True
-                in_skeleton = False
-            elif 'SKELETON' in line:
-                if current_hole:
-                    self.holes.append(current_hole)
-                    current_hole = []
-                in_skeleton = True
-                in_hole = False
-            elif 'RING' in line:
-                in_skeleton = False
-                in_hole = False
-
-            m = re.match(r'G1X([-\d.]+)Y([-\d.]+)', line)
-            if m:
-                x, y = float(m.group(1)), float(m.group(2))
-                if in_hole:
-                    current_hole.append((x, y))
-                elif in_skeleton:
-                    self.points.append((x, y))
-
-        if current_hole:
-            self.holes.append(current_hole)
+        self.points, self.holes = load_skeleton_holes(filepath)
+        self._analyze_key = None
 
         print(f"[BROK] Loaded {len(self.points)} skeleton points, {len(self.holes)} holes")
         return self
@@ -97,41 +100,39 @@ class BrokCNC:
 
     def analyze_skeleton(self):
         """Analyze skeleton to identify jaw regions for teeth"""
-        if not self.points:
+        if not len(self.points):
             return {}
 
-        min_x = min(p[0] for p in self.points)
-        max_x = max(p[0] for p in self.points)
-        min_y = min(p[1] for p in self.points)
-        max_y = max(p[1] for p in self.points)
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-
-        self.features = {
-            'snout_tip': None,
-            'upper_jaw': [],
-            'lower_jaw': [],
-            'back_spines': [],
-            'body': []
-        }
-
-        snout_tip = max(self.points, key=lambda p: p[0])
-        self.features['snout_tip'] = snout_tip
+        # Same skeleton as last time -> same regions
+        key = hashlib.blake2b(self.points.tobytes(), digest_size=16).digest()
+        if key == self._analyze_key:
+            return self.features
+
+        mins = self.points.min(axis=0)
+        maxs = self.points.max(axis=0)
+        center_x, center_y = ((mins + maxs) / 2).tolist()
+
+        snout_tip = self.points[self.points[:, 0].argmax()]
         snout_y = snout_tip[1]
 
-        for i, (x, y) in enumerate(self.points):
-            if x > center_x + 2 and y > snout_y - 1 and y < snout_y + 3:
-                self.features['upper_jaw'].append((i, x, y))
-            elif x > center_x + 1 and y < snout_y - 1 and y > snout_y - 4:
-                self.features['lower_jaw'].append((i, x, y))
-            elif x < center_x - 1:
-                self.features['back_spines'].append((i, x, y))
-            else:
-                self.features['body'].append((i, x, y))
+        # Region masks, in the same priority order: upper, lower, back, body
+        x, y = self.points[:, 0], self.points[:, 1]
+        m_up = (x > center_x + 2) & (y > snout_y - 1) & (y < snout_y + 3)
+        m_lo = ~m_up & (x > center_x + 1) & (y < snout_y - 1) & (y > snout_y - 4)
+        m_back = ~(m_up | m_lo) & (x < center_x - 1)
+        m_body = ~(m_up | m_lo | m_back)
+
+        # Each region is stored as parallel index / x / y arrays
+        idx = np.arange(len(self.points), dtype=np.int32)
+        self.features = {'snout_tip': snout_tip}
+        for name, mask in (('upper_jaw', m_up), ('lower_jaw', m_lo),
+                           ('back_spines', m_back), ('body', m_body)):
+            self.features[name] = {'idx': idx[mask], 'x': x[mask], 'y': y[mask]}
 
         print(f"[BROK GPS] Snout tip at {self.grid_coord(*snout_tip)}")
-        print(f"[BROK GPS] Upper jaw: {len(self.features['upper_jaw'])} points")
-        print(f"[BROK GPS] Lower jaw: {len(self.features['lower_jaw'])} points")
+        print(f"[BROK GPS] Upper jaw: {len(self.features['upper_jaw']['idx'])} points")
+        print(f"[BROK GPS] Lower jaw: {len(self.features['lower_jaw']['idx'])} points")
+        self._analyze_key = key
         return self.features
 
     def add_teeth(self, jaw='both', tooth_height=0.3, num_teeth=6):
@@ -139,42 +140,54 @@ class BrokCNC:
         if not self.features:
             self.analyze_skeleton()
 
-        teeth_added = 0
-        insertions = []
-
-        if jaw in ['both', 'upper'] and self.features['upper_jaw']:
-            upper_pts = sorted(self.features['upper_jaw'], key=lambda p: p[1])
-            step = max(1, len(upper_pts) // num_teeth)
-            for j in range(0, len(upper_pts), step):
-                if j < len(upper_pts) and teeth_added < num_teeth:
-                    idx, x, y = upper_pts[j]
-                    tooth = [(x - 0.12, y), (x, y - tooth_height), (x + 0.12, y)]
-                    insertions.append((idx, tooth))
-                    teeth_added += 1
-                    print(f"[BROK] Upper tooth at {self.grid_coord(x, y)}")
-
-        if jaw in ['both', 'lower'] and self.features['lower_jaw']:
-            lower_pts = sorted(self.features['lower_jaw'], key=lambda p: p[1])
-            step = max(1, len(lower_pts) // num_teeth)
-            lower_added = 0
-            for j in range(0, len(lower_pts), step):
-                if j < len(lower_pts) and lower_added < num_teeth:
-                    idx, x, y = lower_pts[j]
-                    tooth = [(x - 0.12, y), (x, y + tooth_height), (x + 0.12, y)]
-                    insertions.append((idx, tooth))
-                    lower_added += 1
-                    teeth_added += 1
-                    print(f"[BROK] Lower tooth at {self.grid_coord(x, y)}")
-
-        insertions.sort(key=lambda x: x[0], reverse=True)
-        new_points = list(self.points)
-        for idx, tooth in insertions:
-            new_points = new_points[:idx] + tooth + new_points[idx+1:]
-
-        self.points = new_points
+        jaw_idx = []
+        jaw_teeth = []
+        for side, direction in (('upper', -1), ('lower', 1)):
+            f = self.features[f'{side}_jaw']
+            if jaw not in ('both', side) or not len(f['idx']):
+                continue
+            # Every step-th jaw point left to right, at most num_teeth
+            order = np.argsort(f['x'], kind='stable')
+            step = max(1, len(order) // num_teeth)
+            pick = order[::step][:num_teeth]
+            xs, ys = f['x'][pick], f['y'][pick]
+            # (T, 3, 2) triangles; upper teeth point down, lower teeth up
+            jaw_teeth.append(np.stack((np.column_stack((xs - 0.12, ys)),
+                                       np.column_stack((xs, ys + direction * tooth_height)),
+                                       np.column_stack((xs + 0.12, ys))), axis=1))
+            jaw_idx.append(f['idx'][pick])
+            if log.isEnabledFor(logging.DEBUG):
+                for x, y in zip(xs.tolist(), ys.tolist()):
+                    log.debug("[BROK] %s tooth at %s", side.capitalize(), self.grid_coord(x, y))
+
+        # Each tooth replaces its jaw point; splice everything in one pass
+        idx = np.concatenate(jaw_idx) if jaw_idx else np.empty(0, dtype=np.int32)
+        teeth = np.concatenate(jaw_teeth) if jaw_teeth else np.empty((0, 3, 2))
+        teeth_added = len(idx)
+        segments = []
+        last = 0
+        for k in np.argsort(idx).tolist():
+            segments.append(self.points[last:idx[k]])
+            segments.append(teeth[k])
+            last = idx[k] + 1
+        segments.append(self.points[last:])
+
+        self.points = np.concatenate(segments)
+        self._analyze_key = None
         print(f"[BROK] Added {teeth_added} teeth, skeleton now {len(self.points)} points")
         return self
 
+    @staticmethod
+    def _signed_area(points):
+        """Signed area of a closed contour (shoelace formula)"""
+        a = np.asarray(points, dtype=np.float64)
+        x, y = a[:, 0], a[:, 1]
+        return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+    @staticmethod
+    def _reversed(points):
+        return points[::-1] if isinstance(points, np.ndarray) else list(reversed(points))
+
     def ensure_ccw(self, points):
         """
         BEVEL LAW: Ensure contour is CCW for inside cuts.
@@ -183,18 +196,10 @@ class BrokCNC:
         if len(points) < 3:
             return points
 
-        # Calculate signed area (shoelace formula)
-        area = 0
-        n = len(points)
-        for i in range(n):
-            j = (i + 1) % n
-            area += points[i][0] * points[j][1]
-            area -= points[j][0] * points[i][1]
-
         # Negative area = CW, need to reverse for CCW
-        if area > 0:  # Currently CW
+        if self._signed_area(points) > 0:  # Currently CW
             print("[BEVEL LAW] Reversing to CCW for inside cut")
-            return list(reversed(points))
+            return self._reversed(points)
         return points
 
     def ensure_cw(self, points):
@@ -205,43 +210,36 @@ class BrokCNC:
         if len(points) < 3:
             return points
 
-        area = 0
-        n = len(points)
-        for i in range(n):
-            j = (i + 1) % n
-            area += points[i][0] * points[j][1]
-            area -= points[j][0] * points[i][1]
-
-        if area < 0:  # Currently CCW
+        if self._signed_area(points) < 0:  # Currently CCW
             print("[BEVEL LAW] Reversing to CW for outside cut")
-            return list(reversed(points))
+            return self._reversed(points)
         return points
 
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _unit_circle(num_points, sign):
+        """Read-only (cos, sin) samples; sign -1 = CW, +1 = CCW"""
+        angle = sign * 2 * math.pi * np.arange(num_points + 1) / num_points
+        cos_t, sin_t = np.cos(angle), np.sin(angle)
+        cos_t.setflags(write=False)
+        sin_t.setflags(write=False)
+        return cos_t, sin_t
+
     def generate_circle_cw(self, cx, cy, radius, num_points=120):
         """
         BEVEL LAW: Generate CW circle for outside cuts.
         Start at right (3 o'clock), go DOWN first (clockwise).
         """
-        points = []
-        for i in range(num_points + 1):
-            angle = -2 * math.pi * i / num_points  # Negative = CW
-            x = cx + radius * math.cos(angle)
-            y = cy + radius * math.sin(angle)
-            points.append((x, y))
-        return points
+        cos_t, sin_t = self._unit_circle(num_points, -1)  # Negative = CW
+        return np.column_stack((cx + radius * cos_t, cy + radius * sin_t))
 
     def generate_circle_ccw(self, cx, cy, radius, num_points=120):
         """
         BEVEL LAW: Generate CCW circle for inside cuts.
         Start at right (3 o'clock), go UP first (counter-clockwise).
         """
-        points = []
-        for i in range(num_points + 1):
-            angle = 2 * math.pi * i / num_points  # Positive = CCW
-            x = cx + radius * math.cos(angle)
-            y = cy + radius * math.sin(angle)
-            points.append((x, y))
-        return points
+        cos_t, sin_t = self._unit_circle(num_points, 1)  # Positive = CCW
+        return np.column_stack((cx + radius * cos_t, cy + radius * sin_t))
 
     def generate_gps_grid_image(self, output_path, title="BROK CNC GPS VIEW"):
         """Generate image with GPS grid overlay"""
@@ -252,33 +250,43 @@ class BrokCNC:
         img = Image.new('RGB', (total_size, total_size), '#0a0a0a')
         draw = ImageDraw.Draw(img)
 
+        scale = self.scale
+        bottom = total_size - margin
+
         def to_px(x, y):
-            return (margin + int(x * self.scale),
-                    total_size - margin - int(y * self.scale))
-
-        # Draw GPS grid
-        for i in range(int(self.workpiece_size / self.grid_size) + 1):
-            x = i * self.grid_size
-            px = margin + int(x * self.scale)
-            draw.line([(px, margin), (px, total_size - margin)], fill='#1a3a1a', width=1)
+            return (margin + int(x * scale), bottom - int(y * scale))
+
+        def to_px_flat(arr):
+            """(N, 2) inches -> flat [x0, y0, x1, y1, ...] pixel list"""
+            px = np.empty((len(arr), 2), dtype=np.int32)
+            px[:, 0] = margin + (arr[:, 0] * scale).astype(np.int32)
+            px[:, 1] = bottom - (arr[:, 1] * scale).astype(np.int32)
+            return px.ravel().tolist()
+
+        # Draw GPS grid (offsets and labels computed up front)
+        n_lines = int(self.workpiece_size / self.grid_size) + 1
+        offsets = (np.arange(n_lines) * self.grid_size * self.scale).astype(int).tolist()
+        cols = [chr(65 + i) for i in range(min(n_lines, 26))]
+        rows = [str(i + 1) for i in range(n_lines)]
+        far = total_size - margin
+        line, text = draw.line, draw.text
+        for i, off in enumerate(offsets):
+            px = margin + off
+            line([(px, margin), (px, far)], fill='#1a3a1a', width=1)
             if i < 26:
-                draw.text((px, margin - 15), chr(65 + i), fill='#3a5a3a', anchor='mm')
-            y = i * self.grid_size
-            py = total_size - margin - int(y * self.scale)
-            draw.line([(margin, py), (total_size - margin, py)], fill='#1a3a1a', width=1)
-            draw.text((margin - 20, py), str(i+1), fill='#3a5a3a', anchor='mm')
+                text((px, margin - 15), cols[i], fill='#3a5a3a', anchor='mm')
+            py = far - off
+            line([(margin, py), (far, py)], fill='#1a3a1a', width=1)
+            text((margin - 20, py), rows[i], fill='#3a5a3a', anchor='mm')
 
         # Draw holes (cyan) - CCW per BEVEL LAW
         for hole in self.holes:
             if len(hole) > 2:
-                pts = [to_px(x, y) for x, y in hole]
-                draw.polygon(pts, outline='#4ecdc4', width=2)
+                draw.polygon(to_px_flat(hole), outline='#4ecdc4', width=2)
 
         # Draw skeleton (red)
         if len(self.points) > 1:
-            pts = [to_px(x, y) for x, y in self.points]
-            for i in range(len(pts) - 1):
-                draw.line([pts[i], pts[i+1]], fill='#ff6b6b', width=2)
+            draw.line(to_px_flat(self.points), fill='#ff6b6b', width=2)
 
         # Draw 12" ring (yellow) - CW per BEVEL LAW
         center = to_px(6.75, 6.75)
@@ -288,16 +296,16 @@ class BrokCNC:
                      outline='#ffe66d', width=2)
 
         # Mark features
-        if self.features.get('snout_tip'):
+        if self.features.get('snout_tip') is not None:
             st = to_px(*self.features['snout_tip'])
             draw.ellipse([st[0]-8, st[1]-8, st[0]+8, st[1]+8], outline='#00ff00', width=2)
             draw.text((st[0]+12, st[1]), "SNOUT", fill='#00ff00')
 
         # Title and BEVEL LAW indicator
         try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-            small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 11)
-        except:
+            font = _font("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
+            small = _font("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 11)
+        except OSError:
             font = small = ImageFont.load_default()
 
         draw.text((total_size//2, 25), title, fill='#00ff00', font=font, anchor='mm')
@@ -320,6 +328,16 @@ class BrokCNC:
         print(f"[BROK] GPS image saved: {output_path}")
         return self
 
+    def _emit_cut(self, write, label, pts, start_dx, close=False):
+        """One cut: label, rapid to start (offset by start_dx), pierce,
+        G1 moves, optional return to the first point, torch off"""
+        sx, sy = pts[0]
+        write(f"(=== {label} ===)\nG0X{sx+start_dx:.4f}Y{sy:.4f}\n{self._PIERCE_BLOCK}")
+        write(g1_block(pts))
+        if close:
+            write(f"G1X{sx:.4f}Y{sy:.4f}F47\n")
+        write(self._END_BLOCK)
+
     def generate_gcode(self, output_path, ring_diameter=12.0):
         """
         Generate G-code with BEVEL LAW enforced.
@@ -329,103 +347,34 @@ class BrokCNC:
         """
         self.print_bevel_law()
 
-        gcode = []
-        gcode.append("(BROK CNC - BEVEL LAW ENFORCED)")
-        gcode.append("(Inside cuts: CCW = square on workpiece)")
-        gcode.append("(Outside cuts: CW = square on workpiece)")
-        gcode.append("(Feed:47 Pierce:0.148 Cut:0.059)")
-        gcode.append("(v1.6-af)")
-        gcode.append("G20G90")
-        gcode.append("G0X0.Y0.")
-        gcode.append("H0")
-        gcode.append("")
-
-        cut_num = 0
-
-        # HOLES - INSIDE CUTS - CCW (BEVEL LAW)
-        for hi, hole in enumerate(self.holes):
-            if len(hole) < 10:
-                continue
-            cut_num += 1
-
-            # Enforce CCW for inside cut
-            hole_ccw = self.ensure_ccw(hole)
-
-            gcode.append(f"(=== CUT {cut_num}: HOLE - CCW [BEVEL LAW] ===)")
-            sx, sy = hole_ccw[0]
-            gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-            gcode.append("G92Z0")
-            gcode.append("G38.2Z-5F50")
-            gcode.append("G38.4Z0.5F25")
-            gcode.append("G92Z0")
-            gcode.append("G0Z0.148")
-            gcode.append("M3")
-            gcode.append("G4P0.70")
-            gcode.append("G0Z0.059")
-            gcode.append("H1")
-            for x, y in hole_ccw:
-                gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-            gcode.append("H0")
-            gcode.append("M5")
-            gcode.append("G0Z1")
-            gcode.append("")
-
-        # SKELETON - INSIDE CUT - CCW (BEVEL LAW)
-        if self.points:
+        with open(output_path, 'w') as f:
+            w = f.write
+            w(self._HEADER)
+
+            cut_num = 0
+
+            # HOLES - INSIDE CUTS - CCW (BEVEL LAW)
+            for hole in self.holes:
+                if len(hole) < 10:
+                    continue
+                cut_num += 1
+                self._emit_cut(w, f"CUT {cut_num}: HOLE - CCW [BEVEL LAW]",
+                               self.ensure_ccw(hole), -0.15)
+
+            # SKELETON - INSIDE CUT - CCW (BEVEL LAW), closed
+            if len(self.points):
+                cut_num += 1
+                self._emit_cut(w, f"CUT {cut_num}: SKELETON - CCW [BEVEL LAW]",
+                               self.ensure_ccw(self.points), -0.15, close=True)
+
+            # OUTSIDE RING - CW (BEVEL LAW)
             cut_num += 1
-            skeleton_ccw = self.ensure_ccw(self.points)
-
-            gcode.append(f"(=== CUT {cut_num}: SKELETON - CCW [BEVEL LAW] ===)")
-            sx, sy = skeleton_ccw[0]
-            gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
-            gcode.append("G92Z0")
-            gcode.append("G38.2Z-5F50")
-            gcode.append("G38.4Z0.5F25")
-            gcode.append("G92Z0")
-            gcode.append("G0Z0.148")
-            gcode.append("M3")
-            gcode.append("G4P0.70")
-            gcode.append("G0Z0.059")
-            gcode.append("H1")
-            for x, y in skeleton_ccw:
-                gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-            # Close contour
-            gcode.append(f"G1X{skeleton_ccw[0][0]:.4f}Y{skeleton_ccw[0][1]:.4f}F47")
-            gcode.append("H0")
-            gcode.append("M5")
-            gcode.append("G0Z1")
-            gcode.append("")
-
-        # OUTSIDE RING - CW (BEVEL LAW)
-        cut_num += 1
-        cx, cy = 6.75, 6.75
-        radius = ring_diameter / 2.0
-        ring_cw = self.generate_circle_cw(cx, cy, radius)
-
-        gcode.append(f"(=== CUT {cut_num}: {ring_diameter}\" RING - CW [BEVEL LAW] ===)")
-        sx, sy = ring_cw[0]
-        gcode.append(f"G0X{sx+0.2:.4f}Y{sy:.4f}")
-        gcode.append("G92Z0")
-        gcode.append("G38.2Z-5F50")
-        gcode.append("G38.4Z0.5F25")
-        gcode.append("G92Z0")
-        gcode.append("G0Z0.148")
-        gcode.append("M3")
-        gcode.append("G4P0.70")
-        gcode.append("G0Z0.059")
-        gcode.append("H1")
-        for x, y in ring_cw:
-            gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-        gcode.append("H0")
-        gcode.append("M5")
-        gcode.append("G0Z1")
-        gcode.append("")
-
-        gcode.append("G0X0Y0")
-        gcode.append("M30")
+            ring_cw = self.generate_circle_cw(6.75, 6.75, ring_diameter / 2.0)
+            self._emit_cut(w, f"CUT {cut_num}: {ring_diameter}\" RING - CW [BEVEL LAW]",
+                           ring_cw, 0.2)
 
-        with open(output_path, 'w') as f:
-            f.write("\n".join(gcode))
+            w("G0X0Y0\n")
+            w("M30")
 
         print(f"[BROK] G-code saved: {output_path}")
         print(f"[BROK] Total cuts: {cut_num}")
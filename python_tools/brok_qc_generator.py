@@ -10,66 +10,29 @@ Creates QC (Quality Control) image for approval.
 
 This is the DESIGN PHASE - no G-code changes yet.
 """
-import re
 import math
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from _gcode_io import load_skeleton_holes
 
 print("="*60)
 print("BROK CNC - QC SAMPLE GENERATOR")
 print("="*60)
 
 # Load clean skeleton
-with open("/home/kontomeo/Desktop/JURASSIC_TREX.nc", 'r') as f:
-    lines = f.readlines()
-
-skeleton = []
-holes = []
-current_hole = []
-in_skel = False
-in_hole = False
-
-for line in lines:
-    line = line.strip()
-    if 'HOLE' in line and 'CUT' in line:
-        if current_hole:
-            holes.append(current_hole)
-        current_hole = []
-        in_hole = True
-        in_skel = False
-    elif 'SKELETON' in line:
-        if current_hole:
-            holes.append(current_hole)
-            current_hole = []
-        in_skel = True
-        in_hole = False
-    elif 'RING' in line:
-        in_skel = False
-        in_hole = False
-
-    m = re.match(r'G1X([-\d.]+)Y([-\d.]+)', line)
-    if m:
-        x, y = float(m.group(1)), float(m.group(2))
-        if in_hole:
-            current_hole.append((x, y))
-        elif in_skel:
-            skeleton.append((x, y))
-
-if current_hole:
-    holes.append(current_hole)
+skeleton, holes = load_skeleton_holes("/home/kontomeo/Desktop/JURASSIC_TREX.nc")
 
 print(f"[LOAD] Clean skeleton: {len(skeleton)} points")
 print(f"[LOAD] Holes: {len(holes)}")
 
 # Find jaw points for teeth placement
-upper_jaw = []  # (index, x, y)
-lower_jaw = []
-
-for i, (x, y) in enumerate(skeleton):
-    if x > 9.0 and x < 11.8:
-        if 8.2 < y < 9.8:
-            upper_jaw.append((i, x, y))
-        elif 6.8 < y < 7.9:
-            lower_jaw.append((i, x, y))
+x, y = skeleton[:, 0], skeleton[:, 1]
+in_jaw_x = (x > 9.0) & (x < 11.8)
+m_upper = in_jaw_x & (8.2 < y) & (y < 9.8)
+m_lower = in_jaw_x & ~m_upper & (6.8 < y) & (y < 7.9)
+# (index, x, y)
+upper_jaw = list(zip(np.nonzero(m_upper)[0].tolist(), x[m_upper].tolist(), y[m_upper].tolist()))
+lower_jaw = list(zip(np.nonzero(m_lower)[0].tolist(), x[m_lower].tolist(), y[m_lower].tolist()))
 
 print(f"[JAW] Upper jaw candidates: {len(upper_jaw)}")
 print(f"[JAW] Lower jaw candidates: {len(lower_jaw)}")
@@ -115,6 +78,13 @@ draw = ImageDraw.Draw(img)
 def px(x, y):
     return (margin + int(x * scale), size - margin - int(y * scale))
 
+def px_flat(arr):
+    """(N, 2) inches -> flat [x0, y0, x1, y1, ...] pixel list"""
+    out = np.empty((len(arr), 2), dtype=np.int32)
+    out[:, 0] = margin + (arr[:, 0] * scale).astype(np.int32)
+    out[:, 1] = size - margin - (arr[:, 1] * scale).astype(np.int32)
+    return out.ravel().tolist()
+
 # Grid with labels
 for i in range(29):
     val = i * 0.5
@@ -124,15 +94,13 @@ for i in range(29):
     draw.line([(margin, p), (size-margin, p)], fill=color)
 
 # Draw T-Rex skeleton in RED (workpiece)
-pts = [px(x,y) for x,y in skeleton]
-if len(pts) > 2:
-    draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=3)
+if len(skeleton) > 2:
+    draw.polygon(px_flat(skeleton), outline='#ff6b6b', fill='#2a0a0a', width=3)
 
 # Draw holes in CYAN (removed)
 for hole in holes:
     if len(hole) > 2:
-        hpts = [px(x,y) for x,y in hole]
-        draw.polygon(hpts, outline='#4ecdc4', fill='#0a2020', width=2)
+        draw.polygon(px_flat(hole), outline='#4ecdc4', fill='#0a2020', width=2)
 
 # Draw PROPOSED TEETH in GREEN (for QC review)
 print("\n[QC] Drawing proposed teeth:")
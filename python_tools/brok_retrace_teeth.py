@@ -9,10 +9,26 @@ BROK CNC - Re-trace with Teeth Preserved
 """
 import cv2
 import numpy as np
+import io
 import math
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 import shutil
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+@lru_cache(maxsize=8)
+def _font(path, size):
+    """TrueType fonts are loaded once per (path, size)"""
+    return ImageFont.truetype(path, size)
+
 # BACKUP
 shutil.copy("/home/kontomeo/Desktop/JURASSIC_TREX.nc",
             "/home/kontomeo/Desktop/BROK_BACKUPS/v3_before_retrace.nc")
@@ -22,14 +38,27 @@ print("[BACKUP] v3_before_retrace.nc saved")
 img_path = "/home/kontomeo/Desktop/jp_logo__tyrannosaurus_rex_by_titanuspixel55_derr4aw-pre.png"
 img = cv2.imread(img_path)
 h, w = img.shape[:2]
+
+# Bigger sources only add contour points - 1200px across 10.5" is
+# already <0.01" per pixel, well under the kerf
+MAX_DIM = 1200
+if max(h, w) > MAX_DIM:
+    f = MAX_DIM / max(h, w)
+    img = cv2.resize(img, (int(w * f), int(h * f)), interpolation=cv2.INTER_AREA)
+    print(f"[LOAD] Resized from {w}x{h}")
+    h, w = img.shape[:2]
 print(f"[LOAD] Original image: {w}x{h}")
 
 # Convert to grayscale and threshold for BLACK regions
-gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-_, black_mask = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY_INV)
+# (in place - the gray buffer becomes the mask)
+black_mask = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+cv2.threshold(black_mask, 50, 255, cv2.THRESH_BINARY_INV, dst=black_mask)
 
 # Find contours with HIGH detail (no approximation)
-contours, hierarchy = cv2.findContours(black_mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+# CCOMP keeps a two-level hierarchy: outer boundaries, and the holes in
+# them (the only contours with a parent). Not EXTERNAL - the T-Rex sits
+# inside the image frame and would be dropped
+contours, hierarchy = cv2.findContours(black_mask, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)
 print(f"[TRACE] Found {len(contours)} contours")
 
 # Find T-Rex silhouette (large, non-circular)
@@ -57,13 +86,16 @@ scale = 10.5 / max(h, w)
 offset_x = 6.75 - (w * scale / 2)
 offset_y = 6.75 - (h * scale / 2)
 
+def to_inches(cnt):
+    """OpenCV contour (N, 1, 2) pixels -> (N, 2) inches, Y flipped"""
+    c = cnt.reshape(-1, 2)
+    out = np.empty(c.shape, dtype=np.float64)
+    out[:, 0] = c[:, 0] * scale + offset_x
+    out[:, 1] = (h - c[:, 1]) * scale + offset_y  # Flip Y
+    return out
+
 # Convert to inches
-skeleton_raw = []
-for pt in best_contour:
-    px, py = pt[0]
-    x = px * scale + offset_x
-    y = (h - py) * scale + offset_y  # Flip Y
-    skeleton_raw.append((x, y))
+skeleton_raw = to_inches(best_contour)
 
 print(f"[CONVERT] Raw skeleton: {len(skeleton_raw)} points")
 
@@ -72,47 +104,97 @@ print(f"[CONVERT] Raw skeleton: {len(skeleton_raw)} points")
 # Upper jaw: right side, Y > 7.5 (mouth area)
 # Lower jaw: right side, Y around 6.5-7.5
 
-def find_teeth_in_contour(pts):
-    """Find teeth by detecting sharp angle changes (convex peaks into mouth)"""
-    teeth = []
-    n = len(pts)
-
+# No fastmath: contracting the cross product into an FMA turns exactly
+# collinear pixel steps (cross == 0) into tiny +/- values and adds teeth
+@njit(cache=True)
+def _find_teeth_njit(P, xmin, ymin_up, ymax_up, ymin_lo, ymax_lo, ang_thresh):
+    """Per-vertex angle loop on a (N, 2) contour.
+    Returns (idx, x, y, type_code, angle); type_code 0 = upper, 1 = lower"""
+    n = P.shape[0]
+    k = 3 % n
+    idx = np.empty(n, np.int64)
+    code = np.empty(n, np.int64)
+    ang = np.empty(n, np.float64)
+    count = 0
     for i in range(n):
-        p_prev = pts[(i - 3) % n]
-        p_curr = pts[i]
-        p_next = pts[(i + 3) % n]
-
-        # Vector analysis
-        v1 = (p_curr[0] - p_prev[0], p_curr[1] - p_prev[1])
-        v2 = (p_next[0] - p_curr[0], p_next[1] - p_curr[1])
-
-        # Cross product for turn direction
-        cross = v1[0] * v2[1] - v1[1] * v2[0]
-
-        # Magnitude
-        mag1 = math.sqrt(v1[0]**2 + v1[1]**2)
-        mag2 = math.sqrt(v2[0]**2 + v2[1]**2)
-
+        x = P[i, 0]
+        y = P[i, 1]
+        if x <= xmin:
+            continue
+        a = (i - k) % n
+        b = (i + k) % n
+        v1x = x - P[a, 0]
+        v1y = y - P[a, 1]
+        v2x = P[b, 0] - x
+        v2y = P[b, 1] - y
+        mag1 = math.sqrt(v1x * v1x + v1y * v1y)
+        mag2 = math.sqrt(v2x * v2x + v2y * v2y)
         if mag1 < 0.01 or mag2 < 0.01:
             continue
-
-        # Dot product for angle
-        dot = v1[0]*v2[0] + v1[1]*v2[1]
-        cos_angle = dot / (mag1 * mag2)
-        cos_angle = max(-1, min(1, cos_angle))
+        cos_angle = min(max((v1x * v2x + v1y * v2y) / (mag1 * mag2), -1.0), 1.0)
         angle = math.degrees(math.acos(cos_angle))
+        if angle >= ang_thresh:
+            continue
+        cross = v1x * v2y - v1y * v2x
+        if ymin_up < y < ymax_up and cross < 0:
+            code[count] = 0
+        elif ymin_lo < y < ymax_lo and cross > 0:
+            code[count] = 1
+        else:
+            continue
+        idx[count] = i
+        ang[count] = angle
+        count += 1
+    idx = idx[:count]
+    return idx, P[idx, 0], P[idx, 1], code[:count], ang[:count]
+
+def _find_teeth_numpy(P, xmin, ymin_up, ymax_up, ymin_lo, ymax_lo, ang_thresh):
+    """Same as _find_teeth_njit, vectorized for when numba isn't installed"""
+    n = len(P)
+    # Vector analysis - neighbours 3 points back / ahead on the closed
+    # contour. v1[i] = P[i] - P[i-3]; v2[i] = P[i+3] - P[i] is v1 shifted
+    k = 3 % n
+    v1 = np.empty_like(P)
+    np.subtract(P[k:], P[:n - k], out=v1[k:])
+    np.subtract(P[:k], P[n - k:], out=v1[:k])
+    v2 = np.concatenate((v1[k:], v1[:k]))
+
+    # Cross product for turn direction (explicit 2D form, not np.cross)
+    cross = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+
+    # Magnitude; mag2 is mag1 shifted the same way
+    mag1 = np.sqrt(np.einsum('ij,ij->i', v1, v1))
+    mag2 = np.concatenate((mag1[k:], mag1[:k]))
+    valid = (mag1 >= 0.01) & (mag2 >= 0.01)
+
+    # Dot product for angle (degenerate points are masked out by valid)
+    dot = np.einsum('ij,ij->i', v1, v2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_angle = np.clip(dot / (mag1 * mag2), -1, 1)
+    angle = np.degrees(np.arccos(cos_angle))
+
+    x, y = P[:, 0], P[:, 1]
+    sharp = valid & (x > xmin) & (angle < ang_thresh)
+    upper = sharp & (ymin_up < y) & (y < ymax_up) & (cross < 0)
+    lower = sharp & (ymin_lo < y) & (y < ymax_lo) & (cross > 0)
+
+    idx = np.nonzero(upper | lower)[0]
+    return idx, x[idx], y[idx], lower[idx].astype(np.int64), angle[idx]
 
-        x, y = p_curr
-
-        # Upper jaw teeth: right side, upper mouth area, sharp angle, pointing down
-        if x > 9.0 and 7.8 < y < 9.5 and angle < 100 and cross < 0:
-            teeth.append({'idx': i, 'x': x, 'y': y, 'type': 'upper', 'angle': angle})
+def find_teeth_in_contour(pts):
+    """Find teeth by detecting sharp angle changes (convex peaks into mouth)"""
+    P = np.ascontiguousarray(pts, dtype=np.float64)
+    if len(P) == 0:
+        return []
 
-        # Lower jaw teeth: right side, lower mouth area, sharp angle, pointing up
-        elif x > 9.0 and 6.5 < y < 7.8 and angle < 100 and cross > 0:
-            teeth.append({'idx': i, 'x': x, 'y': y, 'type': 'lower', 'angle': angle})
+    # Right side of the contour, corners sharper than 100 degrees
+    # Upper jaw teeth: upper mouth area, pointing down
+    # Lower jaw teeth: lower mouth area, pointing up
+    find = _find_teeth_njit if HAVE_NUMBA else _find_teeth_numpy
+    idx, x, y, code, angle = find(P, 9.0, 7.8, 9.5, 6.5, 7.8, 100.0)
 
-    return teeth
+    return [{'idx': i, 'x': xi, 'y': yi, 'type': 'lower' if c else 'upper', 'angle': a}
+            for i, xi, yi, c, a in zip(idx.tolist(), x.tolist(), y.tolist(), code.tolist(), angle.tolist())]
 
 all_teeth = find_teeth_in_contour(skeleton_raw)
 upper_teeth = [t for t in all_teeth if t['type'] == 'upper']
@@ -125,18 +207,14 @@ def select_teeth(teeth_list, count):
     if len(teeth_list) <= count:
         return teeth_list
 
-    # Sort by X position
-    sorted_teeth = sorted(teeth_list, key=lambda t: t['x'])
+    # Sort by X position (stable, like sorted())
+    order = np.argsort([t['x'] for t in teeth_list], kind='stable')
 
-    # Select evenly spaced
-    step = len(sorted_teeth) / count
-    selected = []
-    for i in range(count):
-        idx = int(i * step)
-        if idx < len(sorted_teeth):
-            selected.append(sorted_teeth[idx])
+    # Select evenly spaced - every len/count-th tooth, rounded down
+    step = len(order) / count
+    picks = order[(np.arange(count) * step).astype(np.intp)]
 
-    return selected
+    return [teeth_list[i] for i in picks.tolist()]
 
 selected_upper = select_teeth(upper_teeth, 7)
 selected_lower = select_teeth(lower_teeth, 4)
@@ -144,76 +222,87 @@ selected_lower = select_teeth(lower_teeth, 4)
 print(f"[SELECT] Keeping {len(selected_upper)} upper, {len(selected_lower)} lower")
 
 # Get indices of teeth to keep
-keep_indices = set()
-for t in selected_upper + selected_lower:
-    # Keep a range around each tooth (tooth shape is ~5-10 points)
-    for j in range(-8, 9):
-        keep_indices.add((t['idx'] + j) % len(skeleton_raw))
+# Keep a range around each tooth (tooth shape is ~5-10 points)
+centers = np.array([t['idx'] for t in selected_upper + selected_lower], dtype=np.intp)
+keep_indices = np.zeros(len(skeleton_raw), dtype=bool)
+keep_indices[(centers[:, None] + np.arange(-8, 9)) % len(skeleton_raw)] = True
 
 # Build new skeleton: smooth jaw except at kept teeth
 # Also scale kept teeth 15% bigger
 
-def scale_tooth(pts, center_idx, scale_factor=1.15):
-    """Scale a tooth by moving points away from center"""
-    center = pts[center_idx]
-    result = list(pts)
-
-    # Scale points within range of center
-    for j in range(-6, 7):
-        idx = (center_idx + j) % len(pts)
-        if idx == center_idx:
-            continue
-        px, py = pts[idx]
-        cx, cy = center
-
-        # Direction from center
-        dx = px - cx
-        dy = py - cy
-
-        # Scale
-        result[idx] = (cx + dx * scale_factor, cy + dy * scale_factor)
+# Neighbour offsets moved by scale_tooth (the centre itself stays put)
+TOOTH_WINDOW = np.array([j for j in range(-6, 7) if j != 0])
 
-    return result
+def scale_tooth(pts, center_idx, scale_factor=1.15):
+    """Scale a tooth in place by moving points away from center"""
+    window = (center_idx + TOOTH_WINDOW) % len(pts)
+    center = pts[center_idx].copy()
+    pts[window] = center + (pts[window] - center) * scale_factor
+    return pts
 
 # Apply 15% scaling to selected teeth
-skeleton_scaled = list(skeleton_raw)
+skeleton_scaled = skeleton_raw.copy()
 for t in selected_upper + selected_lower:
-    skeleton_scaled = scale_tooth(skeleton_scaled, t['idx'], 1.15)
+    scale_tooth(skeleton_scaled, t['idx'], 1.15)
     print(f"[SCALE] Tooth at ({t['x']:.2f}, {t['y']:.2f}) scaled 15%")
 
 # Simplify non-teeth areas while preserving teeth
-def simplify_preserving_teeth(pts, keep_set, target_points=400):
-    """Simplify contour but preserve points near teeth"""
+def rdp_mask(pts, tol):
+    """Douglas-Peucker on an open polyline -> bool mask of kept points"""
     n = len(pts)
-
-    # Calculate how many points to skip
-    non_teeth_count = n - len(keep_set)
-    target_non_teeth = target_points - len(keep_set)
-
-    if target_non_teeth <= 0 or non_teeth_count <= target_non_teeth:
-        return pts
-
-    skip_rate = non_teeth_count / target_non_teeth
-
-    result = []
-    skip_counter = 0
-
-    for i in range(n):
-        if i in keep_set:
-            result.append(pts[i])
-            skip_counter = 0
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        dx, dy = pts[b] - pts[a]
+        rel = pts[a + 1:b] - pts[a]
+        seg_len = math.hypot(dx, dy)
+        if seg_len > 0:
+            d = np.abs(dx * rel[:, 1] - dy * rel[:, 0]) / seg_len
         else:
-            skip_counter += 1
-            if skip_counter >= skip_rate:
-                result.append(pts[i])
-                skip_counter = 0
-
-    return result
-
-skeleton_final = simplify_preserving_teeth(skeleton_scaled, keep_indices, 450)
+            d = np.hypot(rel[:, 0], rel[:, 1])
+        k = int(d.argmax())
+        if d[k] > tol:
+            m = a + 1 + k
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    return keep
+
+def simplify_arcs(pts, keep, tol):
+    """Keep teeth points (bool mask) verbatim, Douglas-Peucker every arc
+    between them"""
+    P = np.asarray(pts, dtype=np.float64)
+    n = len(P)
+
+    # Rotate so the contour starts on a kept point, and close it with a
+    # copy of that point - every arc then runs between two anchors
+    start = int(keep.argmax())
+    Q = np.concatenate((P[start:], P[:start], P[start:start + 1]))
+    q_keep = np.concatenate((keep[start:], keep[:start], [True]))
+    q_keep[0] = True
+
+    anchors = np.nonzero(q_keep)[0].tolist()
+    for a, b in zip(anchors[:-1], anchors[1:]):
+        if b - a > 1:
+            q_keep[a:b + 1] |= rdp_mask(Q[a:b + 1], tol)
+
+    return P[np.roll(q_keep[:n], start)]
+
+# Tolerance in source pixels: below ~1 px RDP keeps every staircase step of
+# the traced contour. 2.5 px lands back inside the old stride's 450 budget
+SIMPLIFY_TOL_PX = 2.5
+SKELETON_BUDGET = 450
+
+skeleton_final = simplify_arcs(skeleton_scaled, keep_indices, tol=SIMPLIFY_TOL_PX * scale)
 print(f"[SIMPLIFY] Final skeleton: {len(skeleton_final)} points (teeth preserved)")
+if len(skeleton_final) > SKELETON_BUDGET:
+    print(f"[WARN] Skeleton has {len(skeleton_final)} points, over budget of {SKELETON_BUDGET}")
 
-# Find holes (interior contours)
+# Find holes (interior contours - hole boundaries in the CCOMP hierarchy)
 holes = []
 if hierarchy is not None:
     for i, (cnt, hier) in enumerate(zip(contours, hierarchy[0])):
@@ -221,22 +310,18 @@ if hierarchy is not None:
         if parent >= 0:  # Has parent = interior
             area = cv2.contourArea(cnt)
             if 500 < area < 50000:
-                hole_pts = []
-                for pt in cnt[::3]:  # Simplify holes
-                    px, py = pt[0]
-                    x = px * scale + offset_x
-                    y = (h - py) * scale + offset_y
-                    hole_pts.append((x, y))
+                # Simplify holes: Douglas-Peucker at 0.2% of the perimeter,
+                # floored at 1 px so small holes don't keep pixel steps
+                eps = max(1.0, 0.002 * cv2.arcLength(cnt, True))
+                hole_pts = to_inches(cv2.approxPolyDP(cnt, eps, True))
 
                 # Check if in workspace
-                xs = [p[0] for p in hole_pts]
-                ys = [p[1] for p in hole_pts]
-                if 1 < min(xs) and max(xs) < 13 and 1 < min(ys) and max(ys) < 13:
+                mn = hole_pts.min(0)
+                mx = hole_pts.max(0)
+                if 1 < mn[0] and mx[0] < 13 and 1 < mn[1] and mx[1] < 13:
                     # Skip small teeth-like holes in jaw area
-                    cx = sum(xs) / len(xs)
-                    cy = sum(ys) / len(ys)
-                    hw = max(xs) - min(xs)
-                    hh = max(ys) - min(ys)
+                    cx = hole_pts[:, 0].mean()
+                    hw, hh = mx - mn
 
                     is_tooth_hole = (cx > 8.5 and hw < 0.6 and hh < 0.8)
                     if not is_tooth_hole:
@@ -249,18 +334,17 @@ size = 1500
 margin = 50
 img_scale = (size - 2*margin) / 14.0
 
-qc = Image.new('RGB', (size, size), '#0a0a0a')
+# Background + 0.5" grid filled straight into a pixel array
+canvas = np.full((size, size, 3), 0x0a, dtype=np.uint8)
+grid_px = margin + (np.arange(29) * 0.5 * img_scale).astype(int)
+canvas[margin:size - margin + 1, grid_px] = 0x1a
+canvas[grid_px, margin:size - margin + 1] = 0x1a
+qc = Image.fromarray(canvas)
 draw = ImageDraw.Draw(qc)
 
 def px(x, y):
     return (margin + int(x * img_scale), size - margin - int(y * img_scale))
 
-# Grid
-for i in range(29):
-    p = margin + int(i * 0.5 * img_scale)
-    draw.line([(p, margin), (p, size-margin)], fill='#1a1a1a')
-    draw.line([(margin, p), (size-margin, p)], fill='#1a1a1a')
-
 # T-Rex Skeleton in RED (workpiece - STAYS)
 pts = [px(x,y) for x,y in skeleton_final]
 if len(pts) > 2:
@@ -288,9 +372,9 @@ for t in selected_lower:
 
 # Title
 try:
-    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 22)
-    small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
-except:
+    font = _font("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 22)
+    small = _font("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
+except OSError:
     font = small = ImageFont.load_default()
 
 draw.text((size//2, 25), "BROK - RE-TRACED WITH TEETH", fill='#00ff00', font=font, anchor='mm')
@@ -311,6 +395,12 @@ draw.text((50, size-17), "Cyan dots = Lower teeth locations", fill='#00ffff', fo
 qc.save('/home/kontomeo/Desktop/BROK_RETRACE_TEETH.png')
 print(f"[SAVED] BROK_RETRACE_TEETH.png")
 
+def emit_g1(pts):
+    """(N,2) points -> one multi-line block of G1 feed moves (single savetxt call)"""
+    buf = io.StringIO()
+    np.savetxt(buf, np.asarray(pts, dtype=np.float64).reshape(-1, 2), fmt="G1X%.4fY%.4fF47")
+    return buf.getvalue().rstrip("\n")
+
 # Generate G-code
 gcode = []
 gcode.append("(BROK CNC - RE-TRACED WITH TEETH)")
@@ -327,10 +417,17 @@ cut_num = 0
 
 # Holes - CCW
 for hole in holes:
-    if len(hole) < 10:
+    # Holes are already area-filtered and Douglas-Peucker'd, so a
+    # straight-edged one can be down to 3 vertices - only skip degenerates
+    if len(hole) < 3:
         continue
     cut_num += 1
     gcode.append(f"(=== CUT {cut_num}: HOLE - CCW ===)")
+    # Bounding box + centroid for brok_teeth_fix.py, so it doesn't
+    # have to re-measure every hole
+    mn, mx = hole.min(0), hole.max(0)
+    cx, cy = hole.mean(0)
+    gcode.append(f"(HOLE cx={cx:.4f} cy={cy:.4f} w={mx[0]-mn[0]:.4f} h={mx[1]-mn[1]:.4f})")
     sx, sy = hole[0]
     gcode.append(f"G0X{sx-0.15:.4f}Y{sy:.4f}")
     gcode.append("G92Z0")
@@ -342,8 +439,7 @@ for hole in holes:
     gcode.append("G4P0.70")
     gcode.append("G0Z0.059")
     gcode.append("H1")
-    for x, y in hole:
-        gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
+    gcode.append(emit_g1(np.vstack((hole, hole[:1]))))  # closed back to the start
     gcode.append("H0")
     gcode.append("M5")
     gcode.append("G0Z1")
@@ -363,9 +459,7 @@ gcode.append("M3")
 gcode.append("G4P0.70")
 gcode.append("G0Z0.059")
 gcode.append("H1")
-for x, y in skeleton_final:
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-gcode.append(f"G1X{skeleton_final[0][0]:.4f}Y{skeleton_final[0][1]:.4f}F47")
+gcode.append(emit_g1(np.vstack((skeleton_final, skeleton_final[:1]))))  # closed back to the start
 gcode.append("H0")
 gcode.append("M5")
 gcode.append("G0Z1")
@@ -384,11 +478,10 @@ gcode.append("M3")
 gcode.append("G4P0.70")
 gcode.append("G0Z0.059")
 gcode.append("H1")
-for i in range(121):
-    angle = -2 * math.pi * i / 120
-    x = 6.75 + 6.0 * math.cos(angle)
-    y = 6.75 + 6.0 * math.sin(angle)
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
+ring_angle = -2 * np.pi * np.arange(121) / 120
+ring_x = 6.75 + 6.0 * np.cos(ring_angle)
+ring_y = 6.75 + 6.0 * np.sin(ring_angle)
+gcode.append(emit_g1(np.column_stack((ring_x, ring_y))))
 gcode.append("H0")
 gcode.append("M5")
 gcode.append("G0Z1")
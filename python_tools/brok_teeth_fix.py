@@ -7,49 +7,30 @@ BROK CNC - Connect Teeth to Jaw
 - Connect to RED skeleton (no gaps)
 - Leave space at back of jaw
 """
+import io
 import re
-import math
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from _gcode_io import load_skeleton_holes
 
-# Load current G-code
-with open("/home/kontomeo/Desktop/JURASSIC_TREX.nc", 'r') as f:
-    lines = f.readlines()
-
-# Extract skeleton and holes
-skeleton = []
-holes = []
-current_hole = []
-in_skel = False
-in_hole = False
-
-for line in lines:
-    line = line.strip()
-    if 'HOLE' in line and 'CUT' in line:
-        if current_hole:
-            holes.append(current_hole)
-        current_hole = []
-        in_hole = True
-        in_skel = False
-    elif 'SKELETON' in line:
-        if current_hole:
-            holes.append(current_hole)
-            current_hole = []
-        in_skel = True
-        in_hole = False
-    elif 'RING' in line:
-        in_skel = False
-        in_hole = False
-
-    m = re.match(r'G1X([-\d.]+)Y([-\d.]+)', line)
-    if m:
-        x, y = float(m.group(1)), float(m.group(2))
-        if in_hole:
-            current_hole.append((x, y))
-        elif in_skel:
-            skeleton.append((x, y))
-
-if current_hole:
-    holes.append(current_hole)
+@lru_cache(maxsize=8)
+def _font(path, size):
+    """TrueType fonts are loaded once per (path, size)"""
+    return ImageFont.truetype(path, size)
+
+HOLE_META_RE = re.compile(rb'\(HOLE cx=(-?[\d.]+) cy=(-?[\d.]+) w=([\d.]+) h=([\d.]+)\)')
+
+# Load current G-code - skeleton and holes as (N, 2) arrays
+gcode_path = "/home/kontomeo/Desktop/JURASSIC_TREX.nc"
+skeleton, holes = load_skeleton_holes(gcode_path)
+
+# Per-hole (cx, cy, w, h) comments written by brok_retrace_teeth.py -
+# only trusted when there is exactly one per hole
+with open(gcode_path, 'rb') as f:
+    hole_meta = [tuple(map(float, m.groups())) for m in HOLE_META_RE.finditer(f.read())]
+if len(hole_meta) != len(holes):
+    hole_meta = [None] * len(holes)
 
 print(f"Loaded skeleton: {len(skeleton)} points")
 print(f"Loaded holes: {len(holes)}")
@@ -60,16 +41,16 @@ upper_teeth_ref = []  # Cyan shapes in upper jaw
 lower_teeth_ref = []  # Cyan shapes in lower jaw
 other_holes = []      # Non-teeth holes (eye, skull openings)
 
-for hole in holes:
-    if len(hole) < 5:
+for hole, meta in zip(holes, hole_meta):
+    # Simplified holes can be a handful of vertices - only skip degenerates
+    if len(hole) < 3:
         continue
     # Get bounding box
-    xs = [p[0] for p in hole]
-    ys = [p[1] for p in hole]
-    cx = sum(xs) / len(xs)
-    cy = sum(ys) / len(ys)
-    w = max(xs) - min(xs)
-    h = max(ys) - min(ys)
+    if meta:
+        cx, cy, w, h = meta
+    else:
+        cx, cy = hole.mean(0).tolist()
+        w, h = (hole.max(0) - hole.min(0)).tolist()
 
     # Teeth are in right side (X > 8.5) and elongated
     if cx > 8.5 and w < 1.5 and h < 2.0:
@@ -133,9 +114,12 @@ def calculate_teeth_positions(jaw_pts, num_teeth, back_space=0.2):
     if len(jaw_pts) < 2:
         return []
 
+    # Jaw X values, already sorted
+    xs = np.array([p[1] for p in jaw_pts])
+
     # Get X range of jaw
-    x_min = min(p[1] for p in jaw_pts)
-    x_max = max(p[1] for p in jaw_pts)
+    x_min = xs[0]
+    x_max = xs[-1]
     jaw_length = x_max - x_min
 
     # Start teeth after back_space
@@ -144,20 +128,22 @@ def calculate_teeth_positions(jaw_pts, num_teeth, back_space=0.2):
     teeth_span = teeth_end - teeth_start
 
     # Evenly space teeth
-    positions = []
     if num_teeth > 1:
         spacing = teeth_span / (num_teeth - 1)
-        for i in range(num_teeth):
-            x = teeth_start + i * spacing
-            # Find closest skeleton point
-            closest = min(jaw_pts, key=lambda p: abs(p[1] - x))
-            positions.append(closest)
+        targets = teeth_start + np.arange(num_teeth) * spacing
     elif num_teeth == 1:
-        x = (teeth_start + teeth_end) / 2
-        closest = min(jaw_pts, key=lambda p: abs(p[1] - x))
-        positions.append(closest)
+        targets = np.array([(teeth_start + teeth_end) / 2])
+    else:
+        return []
+
+    # Find closest skeleton point - the neighbours either side of each
+    # target, left one on a tie, then the first point with that X
+    # (same pick as min() over the sorted list)
+    k = np.clip(np.searchsorted(xs, targets), 1, len(xs) - 1)
+    left = np.abs(xs[k - 1] - targets) <= np.abs(xs[k] - targets)
+    closest = np.searchsorted(xs, xs[np.where(left, k - 1, k)])
 
-    return positions
+    return [jaw_pts[i] for i in closest.tolist()]
 
 upper_teeth_pos = calculate_teeth_positions(upper_jaw_pts, 7, back_space=0.15)
 lower_teeth_pos = calculate_teeth_positions(lower_jaw_pts, 4, back_space=0.2)
@@ -166,43 +152,39 @@ print(f"Upper teeth positions: {len(upper_teeth_pos)}")
 print(f"Lower teeth positions: {len(lower_teeth_pos)}")
 
 # Build new skeleton with teeth connected
-# Insert tooth shape at each position
-def insert_teeth(skeleton_pts, teeth_positions, tooth_w, tooth_h, direction='down'):
+# Each tooth replaces its skeleton point with a 3-point triangle
+def tooth_shape(x, y, tooth_w, tooth_h, direction='down'):
     """
-    Insert teeth into skeleton contour.
+    (3, 2) tooth triangle at a jaw point, tip in the middle.
     direction: 'down' for upper jaw, 'up' for lower jaw
     """
-    # Sort positions by index descending to insert from end
-    positions = sorted(teeth_positions, key=lambda p: p[0], reverse=True)
-
-    new_skeleton = list(skeleton_pts)
-
-    for idx, x, y in positions:
-        # Create tooth triangle
-        half_w = tooth_w / 2
-        if direction == 'down':
-            # Upper jaw - tooth points down into mouth
-            tooth = [
-                (x - half_w, y),
-                (x, y - tooth_h),  # Tip
-                (x + half_w, y)
-            ]
-        else:
-            # Lower jaw - tooth points up into mouth
-            tooth = [
-                (x - half_w, y),
-                (x, y + tooth_h),  # Tip
-                (x + half_w, y)
-            ]
-
-        # Insert tooth at this position (replace single point with tooth shape)
-        new_skeleton = new_skeleton[:idx] + tooth + new_skeleton[idx+1:]
+    half_w = tooth_w / 2
+    tip = y - tooth_h if direction == 'down' else y + tooth_h
+    return np.column_stack(([x - half_w, x, x + half_w], [y, tip, y]))
 
-    return new_skeleton
-
-# Add teeth to skeleton
-skeleton_with_teeth = insert_teeth(skeleton, upper_teeth_pos, tooth_width, tooth_height_upper, 'down')
-skeleton_with_teeth = insert_teeth(skeleton_with_teeth, lower_teeth_pos, tooth_width, tooth_height_lower, 'up')
+def insert_teeth(skeleton_pts, teeth):
+    """
+    Insert teeth into skeleton contour in one pass.
+    teeth: (idx, tooth) pairs for both jaws, all indices into skeleton_pts
+    """
+    # One tooth per skeleton point (first one wins), ascending index
+    by_idx = {}
+    for idx, tooth in teeth:
+        by_idx.setdefault(idx, tooth)
+    indices = sorted(by_idx)
+    segments = np.split(skeleton_pts, indices)
+
+    # segments[k] (k > 0) starts at the replaced point - drop it
+    parts = [segments[0]]
+    for idx, seg in zip(indices, segments[1:]):
+        parts.append(by_idx[idx])
+        parts.append(seg[1:])
+    return np.concatenate(parts)
+
+# Add teeth to skeleton - both jaws at once so indices stay valid
+teeth = [(idx, tooth_shape(x, y, tooth_width, tooth_height_upper, 'down')) for idx, x, y in upper_teeth_pos]
+teeth += [(idx, tooth_shape(x, y, tooth_width, tooth_height_lower, 'up')) for idx, x, y in lower_teeth_pos]
+skeleton_with_teeth = insert_teeth(skeleton, teeth)
 
 print(f"Skeleton with teeth: {len(skeleton_with_teeth)} points")
 
@@ -211,18 +193,17 @@ size = 1500
 margin = 50
 scale = (size - 2*margin) / 14.0
 
-img = Image.new('RGB', (size, size), '#0a0a0a')
+# Background + 0.5" grid filled straight into a pixel array
+canvas = np.full((size, size, 3), 0x0a, dtype=np.uint8)
+grid_px = margin + (np.arange(29) * 0.5 * scale).astype(int)
+canvas[margin:size - margin + 1, grid_px] = 0x1a
+canvas[grid_px, margin:size - margin + 1] = 0x1a
+img = Image.fromarray(canvas)
 draw = ImageDraw.Draw(img)
 
 def px(x, y):
     return (margin + int(x * scale), size - margin - int(y * scale))
 
-# Grid
-for i in range(29):
-    p = margin + int(i * 0.5 * scale)
-    draw.line([(p, margin), (p, size-margin)], fill='#1a1a1a')
-    draw.line([(margin, p), (size-margin, p)], fill='#1a1a1a')
-
 # Draw OTHER holes in CYAN (these stay as holes)
 for hole in other_holes:
     if len(hole) > 2:
@@ -242,9 +223,9 @@ draw.ellipse([cx-r, cy-r, cx+r, cy+r], outline='#ffe66d', width=3)
 
 # Title and legend
 try:
-    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-    small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
-except:
+    font = _font("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
+    small = _font("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 12)
+except OSError:
     font = small = ImageFont.load_default()
 
 draw.text((size//2, 25), "BROK - TEETH CONNECTED TO JAW", fill='#00ff00', font=font, anchor='mm')
@@ -266,6 +247,12 @@ draw.text((20, size-25), f"Skeleton: {len(skeleton_with_teeth)} pts | Holes: {le
 img.save('/home/kontomeo/Desktop/BROK_TEETH_CONNECTED.png')
 print(f"Saved: BROK_TEETH_CONNECTED.png")
 
+def emit_g1(pts):
+    """(N,2) points -> one multi-line block of G1 feed moves (single savetxt call)"""
+    buf = io.StringIO()
+    np.savetxt(buf, np.asarray(pts, dtype=np.float64).reshape(-1, 2), fmt="G1X%.4fY%.4fF47")
+    return buf.getvalue().rstrip("\n")
+
 # Generate G-code with BEVEL LAW
 gcode = []
 gcode.append("(BROK CNC - TEETH CONNECTED TO JAW)")
@@ -282,7 +269,7 @@ cut_num = 0
 
 # Holes first - CCW (BEVEL LAW)
 for hi, hole in enumerate(other_holes):
-    if len(hole) < 10:
+    if len(hole) < 3:
         continue
     cut_num += 1
     gcode.append(f"(=== CUT {cut_num}: HOLE - CCW [BEVEL LAW] ===)")
@@ -297,8 +284,7 @@ for hi, hole in enumerate(other_holes):
     gcode.append("G4P0.70")
     gcode.append("G0Z0.059")
     gcode.append("H1")
-    for x, y in hole:
-        gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
+    gcode.append(emit_g1(hole))
     gcode.append("H0")
     gcode.append("M5")
     gcode.append("G0Z1")
@@ -318,9 +304,7 @@ gcode.append("M3")
 gcode.append("G4P0.70")
 gcode.append("G0Z0.059")
 gcode.append("H1")
-for x, y in skeleton_with_teeth:
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
-gcode.append(f"G1X{skeleton_with_teeth[0][0]:.4f}Y{skeleton_with_teeth[0][1]:.4f}F47")
+gcode.append(emit_g1(np.vstack((skeleton_with_teeth, skeleton_with_teeth[:1]))))  # closed back to the start
 gcode.append("H0")
 gcode.append("M5")
 gcode.append("G0Z1")
@@ -340,11 +324,10 @@ gcode.append("M3")
 gcode.append("G4P0.70")
 gcode.append("G0Z0.059")
 gcode.append("H1")
-for i in range(121):
-    angle = -2 * math.pi * i / 120
-    x = cx + r * math.cos(angle)
-    y = cy + r * math.sin(angle)
-    gcode.append(f"G1X{x:.4f}Y{y:.4f}F47")
+ring_angle = -2 * np.pi * np.arange(121) / 120
+ring_x = cx + r * np.cos(ring_angle)
+ring_y = cy + r * np.sin(ring_angle)
+gcode.append(emit_g1(np.column_stack((ring_x, ring_y))))
 gcode.append("H0")
 gcode.append("M5")
 gcode.append("G0Z1")
@@ -30,6 +30,42 @@ import json
 import sys
 import os
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional - kernels fall back to plain NumPy
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional - state falls back to the json module
+    orjson = None
+
+@njit(cache=True)
+def _select_jaw_teeth(skel, x_min, y_lo, y_hi, count):
+    """
+    Jaw points (x > x_min, y_lo < y < y_hi) of an (N, 2) skeleton and
+    `count` evenly spaced tooth positions along them.
+    Returns (jaw_indices, tooth_indices).
+    """
+    xs = skel[:, 0]
+    ys = skel[:, 1]
+    idx = np.nonzero((xs > x_min) & (ys > y_lo) & (ys < y_hi))[0]
+    if idx.size < count:
+        return idx, idx
+
+    # Back to front along X, skipping the first 15% and the last 2 points
+    order = idx[np.argsort(xs[idx], kind='mergesort')]
+    start = int(order.size * 0.15)
+    end = order.size - 2
+    step = (end - start) / max(1, count - 1)
+    picks = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        picks[i] = order[int(start + i * step)]
+    return idx, picks
+
 class BrokTracer:
     def __init__(self):
         # Workspace settings (inches)
@@ -42,6 +78,9 @@ class BrokTracer:
         self.grid_minor = 0.25      # Minor grid every 0.25" (6.35mm)
         self.grid_mm = 25.4         # mm per inch
 
+        # Trace simplification - max deviation from the pixel outline
+        self.trace_tol = 0.01       # inches
+
         # Image size
         self.img_size = 2000
         self.margin = 80
@@ -50,6 +89,8 @@ class BrokTracer:
         # Layers
         self.source_image = None    # Original image (background)
         self.source_visible = True  # Show/hide source
+        self._src_cache = {}        # Dimmed, resized source per canvas size
+        self._grid = None           # Grid pixels + colors, built on first render
         self.traces = {
             'skeleton': [],         # Main outline points [(x,y), ...]
             'holes': [],            # List of hole contours
@@ -76,12 +117,65 @@ class BrokTracer:
             self.img_size - self.margin - int(y * self.scale)
         )
 
+    def px_batch(self, xy):
+        """Convert (N, 2) inches to a flat [x0, y0, x1, y1, ...] pixel list
+        (same truncation as px(), ready for draw.polygon)"""
+        out = (np.asarray(xy, dtype=np.float64).reshape(-1, 2) * self.scale).astype(int)
+        out[:, 0] += self.margin
+        out[:, 1] = self.img_size - self.margin - out[:, 1]
+        return out.ravel().tolist()
+
+    def grid_layer(self):
+        """Minor + major grid lines as (flat pixel indices, RGB colors), built once"""
+        if self._grid is None:
+            n = self.img_size
+            lo, hi = self.margin, self.img_size - self.margin + 1
+            minor = self.margin + (np.arange(int(self.workspace_size / self.grid_minor) + 1)
+                                   * self.grid_minor * self.scale).astype(int)
+            major = self.margin + (np.arange(int(self.workspace_size / self.grid_major) + 1)
+                                   * self.grid_major * self.scale).astype(int)
+            major = np.concatenate((major, major + 1))  # 2px wide
+
+            rgb = np.zeros((n, n, 3), dtype=np.uint8)
+            rgb[lo:hi, minor] = 0x1a
+            rgb[minor, lo:hi] = 0x1a
+            rgb[lo:hi, major] = 0x2a
+            rgb[major, lo:hi] = 0x2a
+            idx = np.flatnonzero(rgb[:, :, 0])
+            self._grid = (idx, rgb.reshape(-1, 3)[idx])
+        return self._grid
+
+    def teeth_px(self, teeth, down):
+        """
+        Triangle pixel vertices for (x, y, w, h, direction) teeth, all at once.
+        down: per-tooth bools, True = tip below the jaw point.
+        """
+        if not teeth:
+            return []
+        t = np.array([tooth[:4] for tooth in teeth], dtype=np.float64)
+        x, y, half_w, th = t[:, 0], t[:, 1], t[:, 2] / 2, t[:, 3]
+        tip = np.where(down, y - th, y + th)
+
+        # (T, 3, 2): left base, tip, right base
+        verts = np.stack((np.column_stack((x - half_w, x, x + half_w)),
+                          np.column_stack((y, tip, y))), axis=-1)
+        flat = self.px_batch(verts)
+        return [flat[i:i + 6] for i in range(0, len(flat), 6)]
+
     def inches(self, px_x, px_y):
         """Convert pixels to inches"""
         x = (px_x - self.margin) / self.scale
         y = (self.img_size - self.margin - px_y) / self.scale
         return (x, y)
 
+    def to_workspace(self, cnt, h):
+        """OpenCV contour (N, 1, 2) source pixels -> (N, 2) workspace inches, Y flipped"""
+        c = cnt.reshape(-1, 2)
+        out = np.empty(c.shape, dtype=np.float64)
+        out[:, 0] = c[:, 0] * self.source_scale + self.source_offset[0]
+        out[:, 1] = (h - c[:, 1]) * self.source_scale + self.source_offset[1]
+        return out
+
     def load_source(self, image_path):
         """Load source image as background"""
         print(f"\n[LOAD] Loading source: {image_path}")
@@ -94,9 +188,19 @@ class BrokTracer:
         h, w = img.shape[:2]
         print(f"[LOAD] Image size: {w}x{h}")
 
-        # Store original
+        # Never needed bigger than the ring on the canvas (+10%) - shrink
+        # once here instead of LANCZOS-resizing full res on every render
+        target = int(self.ring_diameter * self.scale * 1.1)
+        if max(h, w) > target:
+            img = cv2.resize(img, (target * w // max(h, w), target * h // max(h, w)),
+                             interpolation=cv2.INTER_AREA)
+            h, w = img.shape[:2]
+            print(f"[LOAD] Downscaled to: {w}x{h}")
+
+        # Store source
         self.source_image = img
         self.source_path = image_path
+        self._src_cache.clear()
 
         # Calculate scale to fit in ring
         fit_size = self.ring_diameter - 0.5  # Leave margin
@@ -124,70 +228,65 @@ class BrokTracer:
         img = self.source_image
         h, w = img.shape[:2]
 
-        # Convert to grayscale and threshold
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, mask = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY_INV)
+        # Convert to grayscale and threshold (in place - the gray buffer
+        # becomes the mask)
+        mask = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        cv2.threshold(mask, 50, 255, cv2.THRESH_BINARY_INV, dst=mask)
 
-        # Find contours with full detail
-        contours, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+        # Find contours - straight pixel runs collapsed to their end points
+        contours, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
         print(f"[TRACE] Found {len(contours)} contours")
 
-        # Find main silhouette (largest non-circular)
+        # Areas once, shared by the silhouette and hole passes
+        areas = np.fromiter((cv2.contourArea(cnt) for cnt in contours),
+                            dtype=np.float64, count=len(contours))
+
+        # Find main silhouette (longest boundary, non-circular)
+        # Every contour is a candidate - the T-Rex may sit inside a frame.
+        # Rank by arcLength, not len(cnt): CHAIN_APPROX_SIMPLE drops the
+        # points on straight runs, so the point count isn't the length.
+        # Longest first (ties keep file order), stop at the first one
+        # that isn't round
         best = None
-        best_len = 0
+        perims = np.fromiter((cv2.arcLength(cnt, True) for cnt in contours), dtype=np.float64, count=len(contours))
 
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            perim = cv2.arcLength(cnt, True)
-            if perim > 0:
-                circ = 4 * math.pi * area / (perim * perim)
-                if circ < 0.6 and len(cnt) > best_len:
-                    best = cnt
-                    best_len = len(cnt)
+        for i in np.argsort(-perims, kind='stable').tolist():
+            perim = perims[i]
+            if perim > 0 and 4 * math.pi * areas[i] / (perim * perim) < 0.6:
+                best = contours[i]
+                break
 
         if best is None:
             print("[ERROR] No suitable contour found")
             return False
 
-        # Convert to workspace coordinates
-        skeleton = []
-        for pt in best:
-            px, py = pt[0]
-            x = px * self.source_scale + self.source_offset[0]
-            y = (h - py) * self.source_scale + self.source_offset[1]
-            skeleton.append((x, y))
-
-        # Simplify (keep every Nth point for manageable size)
-        step = max(1, len(skeleton) // 500)
-        self.traces['skeleton'] = skeleton[::step]
+        # Simplify (Douglas-Peucker to trace_tol) and convert to
+        # workspace coordinates
+        # Traces stay plain lists so the state file is JSON
+        eps = self.trace_tol / self.source_scale  # in source pixels
+        skeleton = self.to_workspace(cv2.approxPolyDP(best, eps, True), h)
+        self.traces['skeleton'] = skeleton.tolist()
 
         print(f"[TRACE] Skeleton: {len(self.traces['skeleton'])} points")
 
         # Find interior holes
         self.traces['holes'] = []
         if hierarchy is not None:
-            for i, (cnt, hier) in enumerate(zip(contours, hierarchy[0])):
-                parent_idx = hier[3]
-                if parent_idx >= 0:
-                    area = cv2.contourArea(cnt)
-                    if 500 < area < 30000:
-                        hole_pts = []
-                        for pt in cnt[::3]:  # Simplify
-                            px, py = pt[0]
-                            x = px * self.source_scale + self.source_offset[0]
-                            y = (h - py) * self.source_scale + self.source_offset[1]
-                            hole_pts.append((x, y))
-
-                        # Check if in workspace
-                        xs = [p[0] for p in hole_pts]
-                        ys = [p[1] for p in hole_pts]
-                        cx, cy = sum(xs)/len(xs), sum(ys)/len(ys)
-
-                        # Keep only real holes (eye, skull) not tooth gaps
-                        if area > 2000 and 1 < min(xs) and max(xs) < 13:
-                            self.traces['holes'].append(hole_pts)
-                            print(f"[TRACE] Hole: {len(hole_pts)} pts at ({cx:.2f}, {cy:.2f})")
+            # Children only; real holes (eye, skull) are 2000-30000 px,
+            # smaller ones are tooth gaps
+            parents = hierarchy[0][:, 3]
+            candidates = np.nonzero((parents >= 0) & (areas > 2000) & (areas < 30000))[0]
+            for i in candidates.tolist():
+                hole_pts = self.to_workspace(cv2.approxPolyDP(contours[i], eps, True), h)  # Simplify
+
+                # Check if in workspace
+                cx, cy = hole_pts.mean(0)
+                xs = hole_pts[:, 0]
+
+                if 1 < xs.min() and xs.max() < 13:
+                    self.traces['holes'].append(hole_pts.tolist())
+                    print(f"[TRACE] Hole: {len(hole_pts)} pts at ({cx:.2f}, {cy:.2f})")
 
         print(f"[TRACE] Total holes: {len(self.traces['holes'])}")
         return True
@@ -201,38 +300,27 @@ class BrokTracer:
         print(f"\n[TEETH] Adding {upper_count} upper, {lower_count} lower teeth...")
 
         skeleton = self.traces['skeleton']
+        skel = np.asarray(skeleton, dtype=np.float64)
 
-        # Find jaw regions
-        upper_jaw = [(i, x, y) for i, (x, y) in enumerate(skeleton)
-                     if x > 9.0 and 8.3 < y < 10.0]
-        lower_jaw = [(i, x, y) for i, (x, y) in enumerate(skeleton)
-                     if x > 9.0 and 6.5 < y < 7.8]
+        # Find jaw regions and evenly spaced positions
+        upper_jaw, upper_picks = _select_jaw_teeth(skel, 9.0, 8.3, 10.0, upper_count)
+        lower_jaw, lower_picks = _select_jaw_teeth(skel, 9.0, 6.5, 7.8, lower_count)
 
         print(f"[TEETH] Upper jaw points: {len(upper_jaw)}")
         print(f"[TEETH] Lower jaw points: {len(lower_jaw)}")
 
-        # Select evenly spaced positions
-        def select_positions(jaw_pts, count):
-            if len(jaw_pts) < count:
-                return jaw_pts
-            sorted_pts = sorted(jaw_pts, key=lambda p: p[1])
-            start = int(len(sorted_pts) * 0.15)
-            end = len(sorted_pts) - 2
-            step = (end - start) / max(1, count - 1)
-            return [sorted_pts[int(start + i * step)] for i in range(count)]
-
         # Tooth size (15% bigger)
         tooth_w = 0.40
         tooth_h = 0.52
 
         # Store teeth positions
         self.traces['teeth_upper'] = []
-        for idx, x, y in select_positions(upper_jaw, upper_count):
+        for x, y in (skeleton[i] for i in upper_picks.tolist()):
             self.traces['teeth_upper'].append((x, y, tooth_w, tooth_h, 'down'))
             print(f"[TEETH] Upper: ({x:.2f}, {y:.2f}) -> down")
 
         self.traces['teeth_lower'] = []
-        for idx, x, y in select_positions(lower_jaw, lower_count):
+        for x, y in (skeleton[i] for i in lower_picks.tolist()):
             self.traces['teeth_lower'].append((x, y, tooth_w, tooth_h, 'up'))
             print(f"[TEETH] Lower: ({x:.2f}, {y:.2f}) -> up")
 
@@ -242,74 +330,64 @@ class BrokTracer:
         """Render current state to image"""
         print(f"\n[RENDER] Creating image...")
 
-        img = Image.new('RGB', (self.img_size, self.img_size), '#0a0a0a')
-        draw = ImageDraw.Draw(img)
+        # Background, source and grid are composed in a NumPy buffer;
+        # PIL only draws the traces and text on top
+        canvas = np.full((self.img_size, self.img_size, 3), 0x0a, dtype=np.uint8)
 
         # Draw source image as background (if visible)
         if show_source and self.source_image is not None:
             src = self.source_image
             h, w = src.shape[:2]
 
-            # Convert BGR to RGB
-            src_rgb = cv2.cvtColor(src, cv2.COLOR_BGR2RGB)
-            src_pil = Image.fromarray(src_rgb)
-
             # Scale and position
             new_w = int(w * self.source_scale * self.scale)
             new_h = int(h * self.source_scale * self.scale)
-            src_resized = src_pil.resize((new_w, new_h), Image.Resampling.LANCZOS)
+
+            # Resize + dim once per source and size (LANCZOS is the slow part)
+            src_dark = self._src_cache.get((new_w, new_h))
+            if src_dark is None:
+                # Convert BGR to RGB
+                src_rgb = cv2.cvtColor(src, cv2.COLOR_BGR2RGB)
+                src_pil = Image.fromarray(src_rgb)
+                src_resized = src_pil.resize((new_w, new_h), Image.Resampling.LANCZOS)
+
+                # Transparency effect
+                src_dark = Image.blend(Image.new('RGB', src_resized.size, '#0a0a0a'), src_resized, 0.4)
+                src_dark = np.asarray(src_dark)
+                self._src_cache[(new_w, new_h)] = src_dark
 
             # Calculate position
             pos_x = self.margin + int(self.source_offset[0] * self.scale)
             pos_y = self.img_size - self.margin - int((self.source_offset[1] + h * self.source_scale) * self.scale)
 
-            # Paste with transparency effect
-            src_dark = Image.blend(Image.new('RGB', src_resized.size, '#0a0a0a'), src_resized, 0.4)
-            img.paste(src_dark, (pos_x, pos_y))
+            canvas[pos_y:pos_y + new_h, pos_x:pos_x + new_w] = src_dark
 
         # Draw grid
         if show_grid:
-            # Minor grid
-            for i in range(int(self.workspace_size / self.grid_minor) + 1):
-                val = i * self.grid_minor
-                p = self.margin + int(val * self.scale)
-                draw.line([(p, self.margin), (p, self.img_size - self.margin)], fill='#1a1a1a')
-                draw.line([(self.margin, p), (self.img_size - self.margin, p)], fill='#1a1a1a')
-
-            # Major grid
-            for i in range(int(self.workspace_size / self.grid_major) + 1):
-                val = i * self.grid_major
-                p = self.margin + int(val * self.scale)
-                draw.line([(p, self.margin), (p, self.img_size - self.margin)], fill='#2a2a2a', width=2)
-                draw.line([(self.margin, p), (self.img_size - self.margin, p)], fill='#2a2a2a', width=2)
+            grid_idx, grid_rgb = self.grid_layer()
+            canvas.reshape(-1, 3)[grid_idx] = grid_rgb
+
+        img = Image.fromarray(canvas)
+        draw = ImageDraw.Draw(img)
 
         # Draw skeleton trace in RED
-        if self.traces['skeleton']:
-            pts = [self.px(x, y) for x, y in self.traces['skeleton']]
-            if len(pts) > 2:
-                draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=2)
+        if len(self.traces['skeleton']) > 2:
+            pts = self.px_batch(self.traces['skeleton'])
+            draw.polygon(pts, outline='#ff6b6b', fill='#2a0a0a', width=2)
 
         # Draw holes in CYAN
         for hole in self.traces['holes']:
             if len(hole) > 2:
-                pts = [self.px(x, y) for x, y in hole]
+                pts = self.px_batch(hole)
                 draw.polygon(pts, outline='#4ecdc4', fill='#0a2020', width=2)
 
         # Draw teeth in GREEN (upper) and YELLOW (lower)
-        for x, y, tw, th, direction in self.traces['teeth_upper']:
-            half_w = tw / 2
-            if direction == 'down':
-                tooth = [self.px(x - half_w, y), self.px(x, y - th), self.px(x + half_w, y)]
-            else:
-                tooth = [self.px(x - half_w, y), self.px(x, y + th), self.px(x + half_w, y)]
+        upper = self.traces['teeth_upper']
+        for tooth in self.teeth_px(upper, [t[4] == 'down' for t in upper]):
             draw.polygon(tooth, outline='#00ff00', fill='#0a3a0a', width=2)
 
-        for x, y, tw, th, direction in self.traces['teeth_lower']:
-            half_w = tw / 2
-            if direction == 'up':
-                tooth = [self.px(x - half_w, y), self.px(x, y + th), self.px(x + half_w, y)]
-            else:
-                tooth = [self.px(x - half_w, y), self.px(x, y - th), self.px(x + half_w, y)]
+        lower = self.traces['teeth_lower']
+        for tooth in self.teeth_px(lower, [t[4] != 'up' for t in lower]):
             draw.polygon(tooth, outline='#ffff00', fill='#3a3a0a', width=2)
 
         # Draw ring
@@ -364,8 +442,13 @@ class BrokTracer:
             'traces': self.traces
         }
 
-        with open(self.state_file, 'w') as f:
-            json.dump(state, f, indent=2)
+        # Compact - the state is thousands of points
+        if orjson is not None:
+            with open(self.state_file, 'wb') as f:
+                f.write(orjson.dumps(state, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(self.state_file, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
 
         print(f"[SAVE] State saved to {self.state_file}")
 
@@ -375,8 +458,9 @@ class BrokTracer:
             print(f"[LOAD] No state file found")
             return False
 
-        with open(self.state_file, 'r') as f:
-            state = json.load(f)
+        with open(self.state_file, 'rb') as f:
+            data = f.read()
+        state = orjson.loads(data) if orjson is not None else json.loads(data)
 
         if state.get('source_path'):
             self.load_source(state['source_path'])